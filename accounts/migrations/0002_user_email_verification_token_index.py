@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='email_verification_token',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+    ]
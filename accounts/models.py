@@ -17,7 +17,7 @@ class User(AbstractUser):
     linkedin = models.CharField(max_length=100, blank=True)
     github = models.CharField(max_length=100, blank=True)
     is_email_verified = models.BooleanField(default=False)
-    email_verification_token = models.CharField(max_length=100, blank=True)
+    email_verification_token = models.CharField(max_length=100, blank=True, db_index=True)
     created_at = models.DateTimeField(default=timezone.now)
     
     def __str__(self):
@@ -12,4 +12,5 @@ urlpatterns = [
     path('profile/update/', views.profile_update_view, name='profile_update'),
     path('favorites/', views.favorites_view, name='favorites'),
     path('author/<str:username>/', views.author_detail_view, name='author_detail'),
+    path('author/<str:username>/feed/<str:format>/', views.author_feed, name='author_feed'),
 ]
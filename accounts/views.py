@@ -3,11 +3,16 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.mail import send_mail
-from django.conf import settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.contrib.auth.views import LoginView
+from django.db.models import Count, Max, Q, Sum
+from blog.caching import conditional_page, get_version
+from blog.models import Blog, with_author_stats
+from blog.pagination import CursorPaginator
+from blog.syndication import feed_page_state, feed_response
+from blog_site.db_router import replica_reads
+from notifications.models import queue_email
 from .forms import CustomUserCreationForm, CustomAuthenticationForm, ProfileUpdateForm
 from .models import User
 
@@ -42,13 +47,7 @@ def register_view(request):
             Blog Site Team
             '''
             
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                fail_silently=False,
-            )
+            queue_email(subject, message, [user.email])
             
             messages.success(request, 'Registration successful! Please check your email to verify your account.')
             return redirect('accounts:login')
@@ -103,15 +102,65 @@ def profile_update_view(request):
     
     return render(request, 'accounts/profile_update.html', {'form': form})
 
+@replica_reads
 @login_required
 def favorites_view(request):
-    favorites = request.user.favorites.all().select_related('blog', 'blog__author')
-    return render(request, 'accounts/favorites.html', {'favorites': favorites})
+    # Only the columns the cards show
+    favorites = request.user.favorites.select_related('blog__author', 'blog__category').only(
+        'user_id', 'created_at', 'blog__title', 'blog__slug', 'blog__excerpt', 'blog__featured_image', 'blog__created_at',
+        'blog__author__username', 'blog__author__first_name', 'blog__author__last_name', 'blog__category__name',
+    )
+    page_obj = CursorPaginator(favorites, 12, ['-created_at', '-id']).get_page(request.GET.get('cursor'))
+    return render(request, 'accounts/favorites.html', {'page_obj': page_obj})
+
+# What the author page shows of the author
+AUTHOR_PAGE_FIELDS = (
+    'username', 'first_name', 'last_name', 'role', 'bio', 'profile_picture',
+    'website', 'github', 'linkedin', 'twitter', 'date_joined',
+)
 
+def author_page_state(request, username):
+    # The author's fields and the counters summed over their posts cover the
+    # page without a shared cache; only category renames then wait for the
+    # next edit of one of the posts
+    published = Q(blogs__status='published')
+    state = User.objects.filter(username=username, role__in=['author', 'admin']).annotate(
+        newest=Max('blogs__updated_at', filter=published),
+        count=Count('blogs', filter=published),
+        views=Sum('blogs__views', filter=published),
+        rating_sum=Sum('blogs__rating_sum', filter=published),
+        rating_count=Sum('blogs__rating_count', filter=published),
+    ).values_list('newest', 'count', 'views', 'rating_sum', 'rating_count', *AUTHOR_PAGE_FIELDS).first()
+    if state is None:
+        return None
+    return state[0], (
+        request.get_full_path(), state, get_version('blog_detail'), get_version('blog_scores'),
+    )
+
+@replica_reads
+@conditional_page(author_page_state)
 def author_detail_view(request, username):
-    author = get_object_or_404(User, username=username, role__in=['author', 'admin'])
-    blogs = author.blogs.filter(status='published').order_by('-created_at')
+    author = get_object_or_404(with_author_stats(User.objects), username=username, role__in=['author', 'admin'])
+    blogs = author.blogs.filter(status='published').select_related('category').only(
+        'title', 'slug', 'excerpt', 'created_at', 'views', 'rating_sum', 'rating_count', 'author_id', 'category__name',
+    )
+    page_obj = CursorPaginator(blogs, 10, ['-created_at', '-id']).get_page(request.GET.get('cursor'))
     return render(request, 'accounts/author_detail.html', {
         'author': author,
-        'blogs': blogs
+        'page_obj': page_obj,
     })
+
+def author_feed_state(request, username, format):
+    return feed_page_state(
+        request, f'author:{username}', format, Blog.objects.filter(status='published', author__username=username),
+    )
+
+@conditional_page(author_feed_state, public=True)
+def author_feed(request, username, format):
+    author = get_object_or_404(User, username=username, role__in=['author', 'admin'])
+    name = author.get_full_name() or author.username
+    return feed_response(
+        request, f'author:{username}', Blog.objects.filter(status='published', author=author), format,
+        f'Blog Site: {name}', reverse('accounts:author_detail', args=[username]),
+        author.bio or f'Latest posts by {name}',
+    )
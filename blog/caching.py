@@ -0,0 +1,177 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+VERSION_KEY = 'blog:version:%s'
+STATS_KEY = 'blog:cache-stats:%s:%s'
+
+# Cached fragments and data sets reported by cache_metrics.
+FRAGMENTS = ('blog_card', 'blog_detail', 'home_feed', 'syndication', 'filter_categories', 'filter_authors')
+
+
+def shared_cache():
+    """Whether the default cache is shared by every process serving the site.
+
+    Versions only invalidate other processes' fragments, pages and feeds
+    through a shared cache, so all of those are off on a per-process one.
+    """
+    return getattr(settings, 'BLOG_CACHE_SHARED', False)
+
+
+def fragment_timeout():
+    return getattr(settings, 'BLOG_FRAGMENT_CACHE_TIMEOUT', 3600)
+
+
+def get_version(name):
+    """Current version token for a cached data set, used as part of its cache keys."""
+    if not shared_cache():
+        return 0
+    key = VERSION_KEY % name
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    # A fresh timestamp rather than incr(), so a version key that was evicted
+    # and recreated can never collide with keys of stale fragments.
+    if shared_cache():
+        cache.set(VERSION_KEY % name, time.time_ns(), None)
+
+
+def versions_state(*names):
+    """``(last_modified, versions)`` of the data sets ``names``, for ``conditional_page``.
+
+    A version is the time of its last bump, so the newest one is when
+    anything depending on them last changed. None without a shared cache,
+    where another process's bumps aren't seen.
+    """
+    if not shared_cache():
+        return None
+    versions = [get_version(name) for name in names]
+    return datetime.fromtimestamp(max(versions) / 1e9, tz=timezone.utc), versions
+
+
+def record(name, hit):
+    key = STATS_KEY % (name, 'hits' if hit else 'misses')
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def get_stats():
+    keys = [STATS_KEY % (name, kind) for name in FRAGMENTS for kind in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    return {
+        name: {kind: values.get(STATS_KEY % (name, kind), 0) for kind in ('hits', 'misses')}
+        for name in FRAGMENTS
+    }
+
+
+def get_or_set(name, key, build):
+    if not shared_cache():
+        return build()
+    value = cache.get(key)
+    record(name, value is not None)
+    if value is None:
+        value = build()
+        cache.set(key, value, fragment_timeout())
+    return value
+
+
+def cached_queryset(name, queryset):
+    """Evaluate ``queryset`` once per version of data set ``name``."""
+    key = f'blog:data:{name}:{get_version(name)}'
+    return get_or_set(name, key, lambda: list(queryset))
+
+
+def is_shared_page(request):
+    """Whether the response to ``request`` is the same for every anonymous reader."""
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and not len(messages.get_messages(request))
+    )
+
+
+def conditional_page(state_func, public=False, not_modified=None):
+    """Answer conditional GETs from anonymous readers without running the view.
+
+    ``state_func(request, *args, **kwargs)`` returns ``(last_modified, parts)``
+    covering everything the page shows, or None to leave the request to the
+    view (e.g. to raise a 404). ``parts`` is hashed into the ETag. Shared pages
+    may be kept by an upstream cache for BLOG_PAGE_S_MAXAGE seconds; pages
+    rendered for a logged-in user are marked private. ``public`` pages, such
+    as feeds, don't depend on the user at all and are shared with everyone.
+    ``not_modified(request, *args, **kwargs)`` is called when a 304 is sent
+    instead of running the view. Async views are supported; their state
+    lookup runs off the event loop.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                # Load the user once for the view and the sync code around it
+                request.user = await request.auser()
+                shared, validators, response = await sync_to_async(check_page_validators)(
+                    request, state_func, args, kwargs, public, not_modified
+                )
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return patch_page_headers(response, shared, validators, public)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            shared, validators, response = check_page_validators(
+                request, state_func, args, kwargs, public, not_modified
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return patch_page_headers(response, shared, validators, public)
+        return wrapper
+    return decorator
+
+
+def check_page_validators(request, state_func, args, kwargs, public=False, not_modified=None):
+    """Return ``(shared, (etag, timestamp), response)``; response is a 304/412 or None."""
+    if request.method not in ('GET', 'HEAD') or not (public or is_shared_page(request)):
+        return False, None, None
+    state = state_func(request, *args, **kwargs)
+    if state is None:
+        return True, None, None
+    last_modified, parts = state
+    etag = quote_etag(hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest())
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None and response.status_code == 304 and not_modified is not None:
+        not_modified(request, *args, **kwargs)
+    return True, (etag, timestamp), response
+
+
+def patch_page_headers(response, shared, validators, public=False):
+    if not shared:
+        patch_cache_control(response, private=True)
+    elif validators is not None and response.status_code in (200, 304):
+        etag, timestamp = validators
+        response.headers.setdefault('ETag', etag)
+        if timestamp is not None:
+            response.headers.setdefault('Last-Modified', http_date(timestamp))
+        patch_cache_control(
+            response, public=True, max_age=0,
+            s_maxage=getattr(settings, 'BLOG_PAGE_S_MAXAGE', 60),
+        )
+        if not public:
+            patch_vary_headers(response, ('Cookie',))
+    return response
@@ -1,5 +1,4 @@
 from django import forms
-from django.utils.text import slugify
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit, Row, Column
 from .models import Blog, Category
@@ -23,20 +22,6 @@ class BlogForm(forms.ModelForm):
             'status',
             Submit('submit', 'Save Blog', css_class='btn btn-primary me-2'),
         )
-    
-    def save(self, commit=True):
-        blog = super().save(commit=False)
-        if not blog.slug:
-            blog.slug = slugify(blog.title)
-            # Ensure unique slug
-            original_slug = blog.slug
-            counter = 1
-            while Blog.objects.filter(slug=blog.slug).exists():
-                blog.slug = f"{original_slug}-{counter}"
-                counter += 1
-        if commit:
-            blog.save()
-        return blog
 
 class CategoryForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,214 @@
+import bisect
+from datetime import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from .caching import record, shared_cache
+from .models import Blog
+
+FEED_KEY = 'blog:home-feed:%s:%s:%s'
+REGISTRY_KEY = 'blog:home-feed:keys'
+
+
+def sort_key(ordering, row):
+    """Ascending sort key of ``row`` for an all-descending ``ordering`` (ending in -id)."""
+    values = []
+    for field in ordering:
+        value = row[field[1:]]
+        values.append(-(value.timestamp() if isinstance(value, datetime) else value))
+    return tuple(values)
+
+
+class FeedIds:
+    """Blog ids of a materialized feed, as a sequence for ``Paginator``.
+
+    Slices past the materialized entries of a truncated feed come from
+    ``queryset``.
+    """
+
+    def __init__(self, feed, queryset):
+        self.feed = feed
+        self.queryset = queryset
+
+    def __len__(self):
+        return self.feed['count']
+
+    def __getitem__(self, index):
+        entries = self.feed['entries']
+        if self.feed['complete'] or index.stop <= len(entries):
+            return [-entry[-1] for entry in entries[index]]
+        return list(self.queryset.values_list('id', flat=True)[index])
+
+
+class HomeFeedCache:
+    """Ordered blog ids of the home feed per (category, author, ordering), in the cache.
+
+    Each feed holds the sort keys of its first ``BLOG_HOME_FEED_DEPTH`` blogs
+    and the total count, so a page costs one ``in_bulk`` fetch instead of a
+    COUNT and a sorted scan. Feeds are updated in place when blogs are saved
+    or deleted and when their counters (ratings, favorites, views) change,
+    rather than rebuilt. A feed that can't tell how an update affects it is
+    dropped and rebuilt on its next hit; ``BLOG_HOME_FEED_TIMEOUT`` bounds how
+    long an update lost to a concurrent writer can go unnoticed.
+
+    At most ``BLOG_HOME_FEED_MAX_FEEDS`` feeds are kept; the least recently
+    used ones are evicted first. Feeds are only kept in a shared cache.
+    """
+
+    @property
+    def enabled(self):
+        # Feeds updated in one process must be seen by all of them
+        return shared_cache() and self.max_feeds > 0
+
+    @property
+    def depth(self):
+        return getattr(settings, 'BLOG_HOME_FEED_DEPTH', 300)
+
+    @property
+    def max_feeds(self):
+        return getattr(settings, 'BLOG_HOME_FEED_MAX_FEEDS', 100)
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'BLOG_HOME_FEED_TIMEOUT', 600)
+
+    def get_page(self, queryset, ordering, category, author, number, per_page):
+        """Page ``number`` of the published ``queryset`` filtered on ``category`` and ``author``.
+
+        Returns None when the feed can't be materialized, so the caller
+        paginates the queryset itself.
+        """
+        if not self.enabled or not all(field.startswith('-') for field in ordering):
+            return None
+        try:
+            category = int(category) if category else None
+            author = int(author) if author else None
+        except ValueError:
+            return None
+        queryset = queryset.order_by(*ordering)
+        feed = self.get(queryset, list(ordering), category, author)
+        page = Paginator(FeedIds(feed, queryset), per_page).get_page(number)
+        ids = list(page.object_list)
+        blogs = queryset.in_bulk(ids)
+        page.object_list = [blogs[pk] for pk in ids if pk in blogs]
+        return page
+
+    def get(self, queryset, ordering, category, author):
+        key = FEED_KEY % (category or '-', author or '-', ','.join(ordering))
+        values = cache.get_many([key, REGISTRY_KEY])
+        feed, registry = values.get(key), values.get(REGISTRY_KEY, [])
+        # An unregistered feed no longer receives updates
+        hit = feed is not None and key in registry
+        record('home_feed', hit)
+        if hit:
+            # Approximate LRU: only feeds in the older half move to the end
+            if registry.index(key) < len(registry) // 2:
+                self.register(key, registry)
+            return feed
+
+        feed = self.build(queryset, ordering, category, author)
+        cache.set(key, feed, self.timeout)
+        self.register(key, registry)
+        return feed
+
+    def build(self, queryset, ordering, category, author):
+        rows = list(queryset.values(*[field[1:] for field in ordering])[:self.depth + 1])
+        complete = len(rows) <= self.depth
+        entries = [sort_key(ordering, row) for row in rows[:self.depth]]
+        return {
+            'category': category,
+            'author': author,
+            'ordering': ordering,
+            'entries': entries,
+            'complete': complete,
+            'count': len(entries) if complete else queryset.count(),
+        }
+
+    def register(self, key, registry):
+        registry = [other for other in registry if other != key] + [key]
+        evicted, registry = registry[:-self.max_feeds], registry[-self.max_feeds:]
+        if evicted:
+            cache.delete_many(evicted)
+        cache.set(REGISTRY_KEY, registry, None)
+
+    def refresh(self, blog_ids, created=False, scores_only=False):
+        """Move ``blog_ids`` to their current place in every cached feed.
+
+        ``created`` says the blogs are new, ``scores_only`` that only their
+        counters changed, so neither was in or left a feed the cache can't see.
+        """
+        registry = cache.get(REGISTRY_KEY) if self.enabled else None
+        feeds = cache.get_many(registry) if registry else {}
+        if not feeds:
+            return
+        fields = {field[1:] for feed in feeds.values() for field in feed['ordering']}
+        rows = {
+            row['id']: row
+            for row in Blog.objects.filter(pk__in=blog_ids).values('status', 'category_id', 'author_id', *fields)
+        }
+        updated, stale = {}, []
+        for key, feed in feeds.items():
+            changed = False
+            for blog_id in blog_ids:
+                result = self.apply(feed, blog_id, rows.get(blog_id), created, scores_only)
+                if result is None:
+                    stale.append(key)
+                    break
+                changed |= result
+            else:
+                # Most feeds don't hold the blogs at all; leave those be
+                if changed:
+                    updated[key] = feed
+        if updated:
+            cache.set_many(updated, self.timeout)
+        if stale:
+            cache.delete_many(stale)
+
+    def apply(self, feed, blog_id, row, created, scores_only):
+        """Update ``feed`` for ``blog_id``, now ``row`` (None if deleted).
+
+        Returns whether the feed changed, or None if it can't tell how.
+        """
+        entries = feed['entries']
+        index = next((i for i, entry in enumerate(entries) if entry[-1] == -blog_id), None)
+        placed = None
+        if index is not None:
+            placed = (index, entries.pop(index))
+        is_member = (
+            row is not None
+            and row['status'] == 'published'
+            and feed['category'] in (None, row['category_id'])
+            and feed['author'] in (None, row['author_id'])
+        )
+        if index is not None:
+            was_member = True
+        elif feed['complete'] or created:
+            was_member = False
+        elif scores_only:
+            was_member = is_member
+        else:
+            # Somewhere past the truncated entries, or not in the feed at all
+            return None
+
+        replaced = None
+        if is_member:
+            key = sort_key(feed['ordering'], row)
+            # Blogs sorting past a truncated feed's last entry stay unmaterialized
+            if feed['complete'] or (entries and key < entries[-1]):
+                position = bisect.bisect_left(entries, key)
+                entries.insert(position, key)
+                replaced = (position, key)
+                if len(entries) > self.depth:
+                    entries.pop()
+                    feed['complete'] = False
+        feed['count'] += is_member - was_member
+        return is_member != was_member or replaced != placed
+
+    def clear(self):
+        registry = cache.get(REGISTRY_KEY)
+        if registry:
+            cache.delete_many(registry)
+        cache.delete(REGISTRY_KEY)
+
+
+home_feeds = HomeFeedCache()
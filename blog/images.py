@@ -0,0 +1,96 @@
+import os
+from io import BytesIO
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+# Named derivative sets used by the templates. Widths are in pixels; cropped
+# presets are cut to a square, for avatars.
+PRESETS = {
+    'card': {'widths': (400, 800)},
+    'featured': {'widths': (800, 1200, 1600)},
+    'avatar': {'widths': (50, 100), 'crop': True},
+    'avatar_large': {'widths': (100, 200), 'crop': True},
+    'profile': {'widths': (160, 320), 'crop': True},
+}
+
+# Which presets each image field is rendered with, for warming derivatives.
+FIELD_PRESETS = {
+    ('blog', 'Blog', 'featured_image'): ('card', 'featured'),
+    ('accounts', 'User', 'profile_picture'): ('avatar', 'avatar_large', 'profile'),
+}
+
+DERIVATIVE_DIR = 'derivatives'
+
+# Raised for sources that can't be read or resized; a source over Pillow's
+# MAX_IMAGE_PIXELS raises DecompressionBombError, which isn't an OSError.
+DERIVATIVE_ERRORS = (OSError, ValueError, Image.DecompressionBombError)
+
+
+def output_format():
+    if getattr(settings, 'IMAGE_DERIVATIVE_WEBP', True) and features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def derivative_name(source_name, width, crop):
+    # The source extension stays in the name, so photo.jpg and photo.png
+    # don't share derivatives
+    base, source_extension = os.path.splitext(source_name)
+    _, extension = output_format()
+    return f"{DERIVATIVE_DIR}/{base}_{source_extension.lstrip('.')}_{width}{'c' if crop else ''}.{extension}"
+
+
+def get_derivative(image, width, crop=False):
+    """Return ``(url, width, height)`` of a resized copy of ``image``, creating it if needed.
+
+    Derivatives are written next to the media files under ``derivatives/`` and
+    never upscaled. Their dimensions are cached so later renders only stat the
+    storage.
+    """
+    name = derivative_name(image.name, width, crop)
+    cache_key = f'blog:image-size:{name}'
+    size = cache.get(cache_key)
+    if size is None:
+        if default_storage.exists(name):
+            with default_storage.open(name) as derivative:
+                size = Image.open(derivative).size
+        else:
+            size = create_derivative(image, name, width, crop)
+        cache.set(cache_key, size, None)
+    return default_storage.url(name), size[0], size[1]
+
+
+def create_derivative(image, name, width, crop):
+    image.open('rb')
+    try:
+        picture = ImageOps.exif_transpose(Image.open(image))
+        picture.load()
+    finally:
+        image.close()
+
+    if crop:
+        side = min(width, picture.width, picture.height)
+        picture = ImageOps.fit(picture, (side, side), Image.LANCZOS)
+    elif picture.width > width:
+        picture = picture.resize((width, round(picture.height * width / picture.width)), Image.LANCZOS)
+
+    image_format, _ = output_format()
+    if image_format == 'JPEG' and picture.mode not in ('RGB', 'L'):
+        picture = picture.convert('RGB')
+    elif picture.mode not in ('RGB', 'RGBA', 'L'):
+        picture = picture.convert('RGBA')
+
+    buffer = BytesIO()
+    picture.save(buffer, image_format, quality=getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80), optimize=True)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(buffer.getvalue()))
+    return picture.size
+
+
+def get_preset_derivatives(image, preset):
+    options = PRESETS[preset]
+    return [get_derivative(image, width, options.get('crop', False)) for width in options['widths']]
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from blog.models import Blog
+
+class Command(BaseCommand):
+    help = 'Populate Blog.excerpt and Blog.word_count for existing posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute every post, not just those without an excerpt')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        blogs = Blog.objects.only('id', 'body').order_by('id')
+        if not options['all']:
+            blogs = blogs.filter(excerpt='')
+
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(blogs.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            for blog in batch:
+                blog.update_excerpt()
+            Blog.objects.bulk_update(batch, ['excerpt', 'word_count'])
+            updated += len(batch)
+            last_id = batch[-1].id
+        self.stdout.write(self.style.SUCCESS(f'Updated excerpts for {updated} blogs'))
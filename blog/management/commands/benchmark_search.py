@@ -0,0 +1,67 @@
+import random
+import statistics
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from blog.models import Blog
+from blog.search import SimpleSearchBackend, get_search_backend
+
+WORDS = (
+    'django python database index query cache latency search engine ranking '
+    'template view model signal migration server request response author '
+    'rating favorite category feed travel food music science history art'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Compare search backend latency against icontains scans on synthetic posts (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000])
+        parser.add_argument('--query', default='database latency')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--words', type=int, default=300, help='Words per synthetic post body')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        self.stdout.write(f'Backend: {type(backend).__name__}, query: {options["query"]!r}')
+        for size in options['sizes']:
+            with transaction.atomic():
+                self.populate(size, options['words'])
+                backend.rebuild()
+                indexed = self.measure(backend, options['query'], options['repeat'])
+                scan = self.measure(SimpleSearchBackend(), options['query'], options['repeat'])
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f'{size:>8} posts: indexed {indexed:8.1f} ms, icontains {scan:8.1f} ms '
+                f'({scan / indexed if indexed else 0:.1f}x)'
+            )
+        backend.rebuild()
+
+    def populate(self, size, words):
+        author = get_user_model().objects.create(username='benchmark-search-author', role='author')
+        rng = random.Random(size)
+        Blog.objects.bulk_create(
+            (
+                Blog(
+                    title=' '.join(rng.choices(WORDS, k=6)),
+                    slug=f'benchmark-search-{i}',
+                    author=author,
+                    body=' '.join(rng.choices(WORDS, k=words)),
+                    status='published',
+                )
+                for i in range(size)
+            ),
+            batch_size=2000,
+        )
+
+    def measure(self, backend, query, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = backend.search(Blog.objects.filter(status='published'), query)
+            results.count()
+            list(results.order_by('-search_rank', '-created_at')[:6])
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from blog.home_feed import REGISTRY_KEY, home_feeds
+from blog.models import Blog
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare every materialized home feed in the cache with the database. '
+        'Needs a shared cache (see CACHES and BLOG_CACHE_SHARED in settings).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drop-stale', action='store_true', help='Remove feeds that differ from the database')
+
+    def handle(self, *args, **options):
+        registry = cache.get(REGISTRY_KEY) or []
+        feeds = cache.get_many(registry)
+        self.stdout.write(f'{len(feeds)} feeds cached, {len(registry)} registered (max {home_feeds.max_feeds})')
+
+        stale = []
+        for key in registry:
+            feed = feeds.get(key)
+            if feed is None:
+                continue
+            expected = home_feeds.build(self.queryset(feed), feed['ordering'], feed['category'], feed['author'])
+            entries = feed['entries']
+            problems = []
+            if feed['count'] != expected['count']:
+                problems.append(f'count {feed["count"]}, expected {expected["count"]}')
+            # A truncated feed may hold fewer entries than a fresh build, but always a prefix of it
+            if entries != expected['entries'][:len(entries)] or (feed['complete'] and not expected['complete']):
+                problems.append('entries out of order or missing')
+            line = f'{key}: {len(entries)} entries, {feed["count"]} blogs'
+            if problems:
+                stale.append(key)
+                self.stdout.write(self.style.ERROR(f'{line}: {"; ".join(problems)}'))
+            else:
+                self.stdout.write(line)
+
+        if stale and options['drop_stale']:
+            cache.delete_many(stale)
+        if stale:
+            raise CommandError(f'{len(stale)} feeds differ from the database.')
+        self.stdout.write(self.style.SUCCESS('All cached feeds match the database.'))
+
+    def queryset(self, feed):
+        blogs = Blog.objects.filter(status='published')
+        if feed['category']:
+            blogs = blogs.filter(category_id=feed['category'])
+        if feed['author']:
+            blogs = blogs.filter(author_id=feed['author'])
+        return blogs.order_by(*feed['ordering'])
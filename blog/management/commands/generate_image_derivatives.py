@@ -0,0 +1,22 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from blog.images import DERIVATIVE_ERRORS, FIELD_PRESETS, get_preset_derivatives
+
+class Command(BaseCommand):
+    help = 'Build resized image derivatives for every featured image and profile picture'
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        for (app_label, model_name, field_name), presets in FIELD_PRESETS.items():
+            model = apps.get_model(app_label, model_name)
+            objects = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for obj in objects.only('pk', field_name).iterator():
+                image = getattr(obj, field_name)
+                for preset in presets:
+                    try:
+                        get_preset_derivatives(image, preset)
+                        built += 1
+                    except DERIVATIVE_ERRORS as exc:
+                        failed += 1
+                        self.stderr.write(f'{image.name} ({preset}): {exc}')
+        self.stdout.write(self.style.SUCCESS(f'Built {built} derivative sets ({failed} failed)'))
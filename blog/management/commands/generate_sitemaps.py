@@ -0,0 +1,23 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from blog.sitemaps import sitemap_root, write_sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Write the sitemap index and paginated sitemaps of blogs, categories and authors to BLOG_SITEMAP_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default=getattr(settings, 'BLOG_SITE_URL', None),
+                            help='Scheme and host the sitemap URLs start with (default: BLOG_SITE_URL)')
+        parser.add_argument('--limit', type=int, help='URLs per sitemap file (default: BLOG_SITEMAP_LIMIT)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows fetched per query')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = write_sitemaps(options['base_url'], limit=options['limit'], batch_size=options['batch_size'])
+        for name, count in written.items():
+            self.stdout.write(f'{name:<32} {count:>8} entries')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {len(written)} files to {sitemap_root()} in {time.perf_counter() - start:.2f}s'
+        ))
@@ -0,0 +1,146 @@
+import random
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from blog.models import Blog, Category, Favorite, Rating
+
+WORDS = (
+    'the of and to in is that it for on with as was by this be are from at or an '
+    'not have but they which one you were all we can her has there been if more '
+    'when will would who so no python django database server cache query index '
+    'travel food music science history design garden coffee city mountain river '
+    'story family season market learning writing reading health running recipe '
+    'photography startup product engineering budget weekend library festival'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create synthetic users, categories, blogs, ratings and favorites for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--author-ratio', type=float, default=0.1, help='Fraction of users who are authors')
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--blogs', type=int, default=10000)
+        parser.add_argument('--ratings', type=int, default=50000)
+        parser.add_argument('--favorites', type=int, default=20000)
+        parser.add_argument('--body-words', type=int, default=600, help='Average words per blog body')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--prefix', default='synth', help='Prefix for generated usernames, slugs and category names')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-user-').exists():
+            raise CommandError(f'Synthetic data with prefix "{prefix}" already exists; pass a different --prefix.')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+
+        user_ids, author_ids = self.create_users(User, prefix, options['users'], options['author_ratio'])
+        if not author_ids:
+            raise CommandError('At least one user is needed to author the blogs.')
+        category_ids = self.create_categories(prefix, options['categories'])
+        blog_ids = self.create_blogs(prefix, options['blogs'], author_ids, category_ids, options['body_words'])
+        self.create_pairs(Rating, options['ratings'], blog_ids, user_ids, lambda: {'score': self.rng.randint(0, 6)})
+        self.create_pairs(Favorite, options['favorites'], blog_ids, user_ids, dict)
+
+        # bulk_create skips Blog.rate() and the search signals
+        call_command('rebuild_rating_aggregates', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+
+    def batches(self, objects):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def random_date(self):
+        return self.now - timedelta(seconds=self.rng.randint(0, 3 * 365 * 24 * 3600))
+
+    def create_users(self, User, prefix, count, author_ratio):
+        password = make_password(None)
+        users = (
+            User(
+                username=f'{prefix}-user-{i}',
+                email=f'{prefix}-user-{i}@example.com',
+                first_name=self.rng.choice(WORDS).title(),
+                last_name=self.rng.choice(WORDS).title(),
+                password=password,
+                role='author' if i < max(1, int(count * author_ratio)) else 'reader',
+                is_email_verified=True,
+                date_joined=self.random_date(),
+            )
+            for i in range(count)
+        )
+        user_ids, author_ids = [], []
+        for batch in self.batches(users):
+            for user in User.objects.bulk_create(batch):
+                user_ids.append(user.pk)
+                if user.role == 'author':
+                    author_ids.append(user.pk)
+        self.stdout.write(f'Created {len(user_ids)} users ({len(author_ids)} authors)')
+        return user_ids, author_ids
+
+    def create_categories(self, prefix, count):
+        categories = Category.objects.bulk_create(
+            Category(name=f'{prefix} {self.rng.choice(WORDS)} {i}') for i in range(count)
+        )
+        self.stdout.write(f'Created {len(categories)} categories')
+        return [category.pk for category in categories]
+
+    def create_blogs(self, prefix, count, author_ids, category_ids, body_words):
+        def build(i):
+            words = self.rng.choices(WORDS, k=max(1, int(self.rng.gauss(body_words, body_words / 3))))
+            blog = Blog(
+                title=' '.join(self.rng.choices(WORDS, k=self.rng.randint(3, 9))).capitalize(),
+                slug=f'{prefix}-post-{i}',
+                author_id=self.rng.choice(author_ids),
+                body=' '.join(words),
+                category_id=self.rng.choice(category_ids) if category_ids and self.rng.random() < 0.9 else None,
+                status='published',
+                created_at=self.random_date(),
+                views=int(self.rng.paretovariate(1.2)) * 10,
+            )
+            blog.update_excerpt()
+            return blog
+
+        blog_ids = []
+        for batch in self.batches(build(i) for i in range(count)):
+            blog_ids.extend(blog.pk for blog in Blog.objects.bulk_create(batch))
+            self.stdout.write(f'Created {len(blog_ids)}/{count} blogs')
+        return blog_ids
+
+    def create_pairs(self, model, count, blog_ids, user_ids, extra):
+        """Create ``count`` unique (blog, user) rows, skewed towards popular blogs."""
+        if not blog_ids or not user_ids:
+            return
+        seen = set()
+        attempts = 0
+
+        def rows():
+            nonlocal attempts
+            while len(seen) < count and attempts < count * 10:
+                attempts += 1
+                # Squaring a uniform sample favours the start of the list
+                blog_id = blog_ids[int(len(blog_ids) * self.rng.random() ** 2)]
+                pair = (blog_id, self.rng.choice(user_ids))
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                yield model(blog_id=pair[0], user_id=pair[1], created_at=self.random_date(), **extra())
+
+        created = 0
+        for batch in self.batches(rows()):
+            model.objects.bulk_create(batch)
+            created += len(batch)
+        self.stdout.write(f'Created {created} {model._meta.verbose_name_plural}')
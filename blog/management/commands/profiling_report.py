@@ -0,0 +1,48 @@
+import json
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Summarise the per-request log written by QueryProfilingMiddleware, grouped by URL name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None, help='Defaults to REQUEST_PROFILING_LOG')
+
+    def handle(self, *args, **options):
+        path = options['file'] or getattr(settings, 'REQUEST_PROFILING_LOG', None)
+        if not path:
+            raise CommandError('No log file given and REQUEST_PROFILING_LOG is not set.')
+        try:
+            with open(path) as log_file:
+                records = [json.loads(line) for line in log_file if line.strip()]
+        except FileNotFoundError:
+            raise CommandError(f'{path} does not exist.')
+
+        by_view = defaultdict(list)
+        for record in records:
+            by_view[record['view'] or '(unresolved)'].append(record)
+
+        budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        self.stdout.write(
+            f'{"view":<28} {"hits":>6} {"q avg":>6} {"q max":>6} {"budget":>6} '
+            f'{"db ms":>8} {"tpl ms":>8} {"p50 ms":>8} {"p95 ms":>8}'
+        )
+        for view, rows in sorted(by_view.items(), key=lambda item: -len(item[1])):
+            queries = [row['queries'] for row in rows]
+            totals = [row['total_ms'] for row in rows]
+            line = (
+                f'{view:<28} {len(rows):>6} {sum(queries) / len(rows):>6.1f} {max(queries):>6} '
+                f'{budgets.get(view, "-"):>6} '
+                f'{sum(row["db_ms"] for row in rows) / len(rows):>8.1f} '
+                f'{sum(row["template_ms"] for row in rows) / len(rows):>8.1f} '
+                f'{percentile(totals, 0.5):>8.1f} {percentile(totals, 0.95):>8.1f}'
+            )
+            over_budget = view in budgets and max(queries) > budgets[view]
+            self.stdout.write(self.style.WARNING(line) if over_budget else line)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from blog.models import Blog, Favorite, Rating
+
+class Command(BaseCommand):
+    help = 'Recompute the stored rating and favorite aggregates and ranking scores on Blog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Blogs per trending score UPDATE')
+
+    def handle(self, *args, **options):
+        ratings = Rating.objects.filter(blog=OuterRef('pk')).order_by().values('blog')
+        favorites = Favorite.objects.filter(blog=OuterRef('pk')).order_by().values('blog')
+        updated = Blog.objects.update(
+            rating_sum=Coalesce(Subquery(ratings.annotate(total=Sum('score')).values('total')), Value(0)),
+            rating_count=Coalesce(Subquery(ratings.annotate(count=Count('id')).values('count')), Value(0)),
+            favorite_count=Coalesce(Subquery(favorites.annotate(count=Count('id')).values('count')), Value(0)),
+        )
+        Blog.objects.update(rating_score=Blog.rating_score_expression(F('rating_sum'), F('rating_count')))
+
+        batch_size = options['batch_size']
+        ids = list(Blog.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), batch_size):
+            Blog.update_trending_scores(ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {updated} blogs'))
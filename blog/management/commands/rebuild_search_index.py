@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from blog.search import get_search_backend
+
+class Command(BaseCommand):
+    help = 'Re-index every blog in the configured search backend'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search index with {type(backend).__name__}'))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:05
+
+from django.db import migrations, models
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Blog = apps.get_model('blog', 'Blog')
+    for blog in Blog.objects.all():
+        totals = blog.ratings.aggregate(total=models.Sum('score'), count=models.Count('id'))
+        blog.rating_sum = totals['total'] or 0
+        blog.rating_count = totals['count']
+        blog.save(update_fields=['rating_sum', 'rating_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_alter_blog_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
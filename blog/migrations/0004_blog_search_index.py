@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE blog_blog_fts USING fts5(title, body, author, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO blog_blog_fts (rowid, title, body, author) "
+            "SELECT blog_blog.id, blog_blog.title, blog_blog.body, accounts_user.username "
+            "FROM blog_blog INNER JOIN accounts_user ON accounts_user.id = blog_blog.author_id"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "ALTER TABLE blog_blog ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(body, '')), 'B')) STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX blog_blog_search_vector_idx ON blog_blog USING gin (search_vector)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS blog_blog_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("ALTER TABLE blog_blog DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('blog', '0003_blog_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
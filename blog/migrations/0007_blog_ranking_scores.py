@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:23
+
+from django.conf import settings
+import math
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+
+def backfill_ranking_scores(apps, schema_editor):
+    # Values frozen from Blog at the time of this migration
+    prior_mean, prior_weight = 3.0, 5
+    epoch, time_scale = datetime(2025, 1, 1, tzinfo=timezone.utc), 45000
+    Blog = apps.get_model('blog', 'Blog')
+    for blog in Blog.objects.annotate(favorites=models.Count('favorited_by')):
+        blog.favorite_count = blog.favorites
+        blog.rating_score = (prior_mean * prior_weight + blog.rating_sum) / (prior_weight + blog.rating_count)
+        engagement = blog.views + 10 * blog.favorite_count + 2 * blog.rating_sum
+        blog.trending_score = (
+            math.log10(max(engagement, 1)) + (blog.created_at - epoch).total_seconds() / time_scale
+        )
+        blog.save(update_fields=['favorite_count', 'rating_score', 'trending_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_blog_feed_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='rating_score',
+            field=models.FloatField(default=3.0),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_ranking_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['-rating_score', '-created_at', '-id'], name='blog_feed_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['-trending_score', '-id'], name='blog_feed_trending_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+def add_search_author(apps, schema_editor):
+    # A generated column can't read the author's row, so PostgreSQL keeps a
+    # copy of the username for the search vector to include. SQLite's FTS
+    # table already indexes it.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("ALTER TABLE blog_blog ADD COLUMN search_author varchar(150) NOT NULL DEFAULT ''")
+    schema_editor.execute(
+        "UPDATE blog_blog SET search_author = accounts_user.username "
+        "FROM accounts_user WHERE accounts_user.id = blog_blog.author_id"
+    )
+    schema_editor.execute("ALTER TABLE blog_blog DROP COLUMN search_vector")
+    schema_editor.execute(
+        "ALTER TABLE blog_blog ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', search_author), 'A') || "
+        "setweight(to_tsvector('english', coalesce(body, '')), 'B')) STORED"
+    )
+    schema_editor.execute(
+        "CREATE INDEX blog_blog_search_vector_idx ON blog_blog USING gin (search_vector)"
+    )
+
+
+def drop_search_author(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("ALTER TABLE blog_blog DROP COLUMN search_vector")
+    schema_editor.execute("ALTER TABLE blog_blog DROP COLUMN search_author")
+    schema_editor.execute(
+        "ALTER TABLE blog_blog ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(body, '')), 'B')) STORED"
+    )
+    schema_editor.execute(
+        "CREATE INDEX blog_blog_search_vector_idx ON blog_blog USING gin (search_vector)"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('blog', '0008_favorite_feed_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_author, drop_search_author),
+    ]
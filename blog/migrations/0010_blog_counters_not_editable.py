@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_blog_search_author'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='blog',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='rating_score',
+            field=models.FloatField(default=3.0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='views',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
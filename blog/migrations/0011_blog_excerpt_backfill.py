@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.utils.text import Truncator
+
+
+def backfill_excerpts(apps, schema_editor):
+    # Blogs saved before 0005 have neither. Values frozen from Blog at the
+    # time of this migration
+    excerpt_words = 30
+    Blog = apps.get_model('blog', 'Blog')
+    batch = []
+    for blog in Blog.objects.filter(word_count=0).only('body').iterator(chunk_size=500):
+        blog.excerpt = Truncator(blog.body).words(excerpt_words)
+        blog.word_count = len(blog.body.split())
+        batch.append(blog)
+        if len(batch) == 500:
+            Blog.objects.bulk_update(batch, ['excerpt', 'word_count'])
+            batch = []
+    Blog.objects.bulk_update(batch, ['excerpt', 'word_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_blog_counters_not_editable'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,23 @@
-from django.db import models
+import random
+import re
+from django.db import IntegrityError, models, transaction
+from datetime import datetime, timezone as dt_timezone
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest, Log, NullIf, Substr
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.text import Truncator, slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.dispatch import Signal
+from .caching import bump_version
 
 User = get_user_model()
 
+# Sent with ``blog_ids`` when stored counters, and so the feed orderings by
+# them, changed through UPDATE queries rather than Blog.save().
+scores_changed = Signal()
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
@@ -18,6 +30,25 @@ class Category(models.Model):
         return self.name
 
 class Blog(models.Model):
+    EXCERPT_WORDS = 30
+    WORDS_PER_MINUTE = 200
+    SLUG_ATTEMPTS = 8
+    # Moved by the rating and favorite signals and the view buffer while an
+    # instance is loaded, so save() leaves them out of its UPDATE
+    COUNTER_FIELDS = ('views', 'rating_sum', 'rating_count', 'rating_score', 'favorite_count', 'trending_score')
+    # Bayesian rating: every post starts with RATING_PRIOR_WEIGHT phantom
+    # ratings of RATING_PRIOR_MEAN, so a single 6/6 can't top the chart.
+    RATING_PRIOR_MEAN = 3.0
+    RATING_PRIOR_WEIGHT = 5
+    # Trending: log10 of engagement plus a recency bonus that grows by 1 every
+    # TRENDING_TIME_SCALE seconds, i.e. a post half a day newer needs ~10x
+    # less engagement to rank the same. The bonus never decays, so scores only
+    # need updating when engagement changes.
+    TRENDING_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+    TRENDING_TIME_SCALE = 45000
+    TRENDING_FAVORITE_WEIGHT = 10
+    TRENDING_RATING_WEIGHT = 2
+
     STATUS_CHOICES = (
         # ('draft', 'Draft'),
         ('published', 'Published'),
@@ -27,30 +58,231 @@ class Blog(models.Model):
     slug = models.SlugField(max_length=200, unique=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='blogs')
     body = models.TextField()
+    excerpt = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
     featured_image = models.ImageField(upload_to='blog_images/', blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
-    views = models.PositiveIntegerField(default=0)
+    # Counters, only ever moved by UPDATE queries; see COUNTER_FIELDS
+    views = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_score = models.FloatField(default=RATING_PRIOR_MEAN, editable=False)
+    favorite_count = models.PositiveIntegerField(default=0, editable=False)
+    trending_score = models.FloatField(default=0, editable=False)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Feed orderings, limited to published posts
+            models.Index(fields=['-created_at', '-id'], name='blog_feed_idx',
+                         condition=models.Q(status='published')),
+            models.Index(fields=['-views', '-created_at', '-id'], name='blog_feed_views_idx',
+                         condition=models.Q(status='published')),
+            models.Index(fields=['category', '-created_at', '-id'], name='blog_feed_category_idx',
+                         condition=models.Q(status='published')),
+            models.Index(fields=['-rating_score', '-created_at', '-id'], name='blog_feed_rating_idx',
+                         condition=models.Q(status='published')),
+            models.Index(fields=['-trending_score', '-id'], name='blog_feed_trending_idx',
+                         condition=models.Q(status='published')),
+            # Author pages and My Blogs; not partial, as My Blogs lists every status
+            models.Index(fields=['author', '-created_at', '-id'], name='blog_author_feed_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'body' in update_fields:
+            self.update_excerpt()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'excerpt', 'word_count'}
+        if self._state.adding and not self.trending_score:
+            # No engagement yet, so recency alone places a new post in the trending feed
+            self.trending_score = self.trending_recency(self.created_at)
+        elif not self._state.adding and update_fields is None and not kwargs.get('force_insert'):
+            # Writing back the counters loaded with this instance would undo
+            # every rating, favorite and view since
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        if self.slug:
+            super().save(*args, **kwargs)
+            return
+
+        # A concurrent save may take the allocated slug first; allocate again,
+        # spreading retries out so the same racers don't keep colliding
+        for attempt in range(self.SLUG_ATTEMPTS):
+            self.slug = self.allocate_slug(self.title, spread=2 ** attempt - 1)
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                taken = Blog.objects.filter(slug=self.slug).exists()
+                self.slug = ''
+                if not taken or attempt == self.SLUG_ATTEMPTS - 1:
+                    raise
+
+    @classmethod
+    def allocate_slug(cls, title, spread=0):
+        """First free slug for ``title``: its slugified form, else the next ``-N`` suffix.
+
+        Finds the highest suffix in use with a single query instead of probing
+        ``-1``, ``-2``, ... in turn. A ``spread`` skips up to that many suffixes
+        at random.
+        """
+        max_length = cls._meta.get_field('slug').max_length
+        base = slugify(title)[:max_length - 8].strip('-') or 'blog'
+        suffix = Cast(Substr('slug', len(base) + 2), models.BigIntegerField())
+        # At most 18 digits, so a hand-made slug can't overflow the cast
+        taken = cls.objects.filter(
+            models.Q(slug=base)
+            | models.Q(slug__startswith=f'{base}-', slug__regex=rf'^{re.escape(base)}-[0-9]{{1,18}}$')
+        ).aggregate(
+            count=models.Count('id'),
+            suffix=models.Max(Case(When(slug=base, then=Value(0)), default=suffix, output_field=models.BigIntegerField())),
+        )
+        if not taken['count']:
+            return base
+        return f"{base}-{taken['suffix'] + 1 + random.randrange(spread + 1)}"
+
+    def update_excerpt(self):
+        self.excerpt = Truncator(self.body).words(self.EXCERPT_WORDS)
+        self.word_count = len(self.body.split())
+
     def get_absolute_url(self):
         return reverse('blog:detail', kwargs={'slug': self.slug})
+
+    def get_reading_time(self):
+        return max(1, round(self.word_count / self.WORDS_PER_MINUTE))
     
     def get_average_rating(self):
-        ratings = self.ratings.all()
-        if ratings:
-            return sum([rating.score for rating in ratings]) / len(ratings)
+        if self.rating_count:
+            return self.rating_sum / self.rating_count
         return 0
 
     def get_rating_count(self):
-        return self.ratings.count()
+        return self.rating_count
+
+    def rate(self, user, score):
+        """Create or update ``user``'s rating; the stored aggregates follow via signals.
+
+        Takes the user's lock (see ``lock_user``) so concurrent rates and batch
+        writes by the same user apply their deltas one at a time.
+        """
+        with transaction.atomic():
+            lock_user(user)
+            rating, created = Rating.objects.select_for_update().get_or_create(
+                blog=self,
+                user=user,
+                defaults={'score': score}
+            )
+            # The Rating signal handlers apply the change to the aggregates
+            if not created:
+                rating.score = score
+                rating.save(update_fields=['score'])
+        self.refresh_from_db(fields=['rating_sum', 'rating_count', 'rating_score', 'trending_score'])
+        return rating, created
+
+    def toggle_favorite(self, user):
+        """Add or remove ``user``'s favorite; True if it was added.
+
+        Takes the user's lock like ``rate()``; the count follows via signals.
+        """
+        with transaction.atomic():
+            lock_user(user)
+            favorite, created = Favorite.objects.get_or_create(user=user, blog=self)
+            if not created:
+                favorite.delete()
+        return created
+
+    @classmethod
+    def add_to_counters(cls, deltas):
+        """Add ``{blog_id: {field: delta}}`` to the stored counters in one UPDATE.
+
+        Keeps ``rating_score`` in step with the rating fields and recomputes
+        the trending scores of the blogs touched.
+        """
+        deltas = {pk: delta for pk, delta in deltas.items() if any(delta.values())}
+        if not deltas:
+            return
+
+        def delta_of(field):
+            return Case(
+                *[When(pk=pk, then=Value(delta[field])) for pk, delta in deltas.items() if delta.get(field)],
+                default=Value(0),
+                output_field=models.IntegerField(),
+            )
+
+        fields = {field for delta in deltas.values() for field, value in delta.items() if value}
+        updates = {field: F(field) + delta_of(field) for field in fields}
+        if fields & {'rating_sum', 'rating_count'}:
+            updates['rating_score'] = cls.rating_score_expression(
+                F('rating_sum') + delta_of('rating_sum'), F('rating_count') + delta_of('rating_count')
+            )
+        cls.objects.filter(pk__in=deltas).update(**updates)
+        cls.update_trending_scores(list(deltas))
+
+    @classmethod
+    def rating_score_expression(cls, rating_sum, rating_count):
+        return (
+            Value(cls.RATING_PRIOR_MEAN * cls.RATING_PRIOR_WEIGHT) + Cast(rating_sum, FloatField())
+        ) / (Value(float(cls.RATING_PRIOR_WEIGHT)) + Cast(rating_count, FloatField()))
+
+    @classmethod
+    def trending_recency(cls, created_at):
+        return (created_at - cls.TRENDING_EPOCH).total_seconds() / cls.TRENDING_TIME_SCALE
+
+    @classmethod
+    def update_trending_scores(cls, blog_ids):
+        """Recompute ``trending_score`` for ``blog_ids`` from their stored counters."""
+        created = dict(cls.objects.filter(pk__in=blog_ids).values_list('pk', 'created_at'))
+        if not created:
+            return
+        recency = Case(
+            *[When(pk=pk, then=Value(cls.trending_recency(created_at))) for pk, created_at in created.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        engagement = (
+            F('views')
+            + F('favorite_count') * cls.TRENDING_FAVORITE_WEIGHT
+            + F('rating_sum') * cls.TRENDING_RATING_WEIGHT
+        )
+        cls.objects.filter(pk__in=created).update(
+            trending_score=Log(10, Greatest(engagement, 1)) + recency
+        )
+        # Counters changed without touching updated_at
+        bump_version('blog_scores')
+        scores_changed.send(sender=cls, blog_ids=list(created))
+
+def lock_user(user):
+    # Serialises a user's rating and favorite writes, so what a batch reads
+    # before writing stays valid; only call it inside a transaction
+    list(User.objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+
+def with_author_stats(users):
+    """Annotate a User queryset with aggregates over each user's published blogs.
+
+    Adds ``published_count``, ``total_views``, ``avg_rating`` and
+    ``last_published`` in the same query, grouped by user.
+    """
+    published = models.Q(blogs__status='published')
+    return users.annotate(
+        published_count=models.Count('blogs', filter=published),
+        total_views=Coalesce(models.Sum('blogs__views', filter=published), 0),
+        avg_rating=Coalesce(
+            Cast(models.Sum('blogs__rating_sum', filter=published), models.FloatField())
+            / NullIf(models.Sum('blogs__rating_count', filter=published), 0),
+            0.0
+        ),
+        last_published=models.Max('blogs__created_at', filter=published),
+    )
 
 class Rating(models.Model):
     blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='ratings')
@@ -61,6 +293,18 @@ class Rating(models.Model):
     class Meta:
         unique_together = ('blog', 'user')
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What the blog aggregates currently include, for the signal handlers
+        instance._stored = (instance.__dict__.get('blog_id'), instance.__dict__.get('score'))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or {'blog', 'blog_id', 'score'} & set(fields):
+            self._stored = (self.blog_id, self.score)
+    
     def __str__(self):
         return f"{self.user.username} rated {self.blog.title}: {self.score}/6"
 
@@ -71,6 +315,10 @@ class Favorite(models.Model):
     
     class Meta:
         unique_together = ('user', 'blog')
+        indexes = [
+            # Favorites page, newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='favorite_user_feed_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} favorited {self.blog.title}"
@@ -0,0 +1,121 @@
+from datetime import datetime
+from django.conf import settings
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+CURSOR_SALT = 'blog.pagination.cursor'
+
+
+def cursor_pagination_enabled(request):
+    return getattr(settings, 'BLOG_CURSOR_PAGINATION', False) or 'cursor' in request.GET
+
+
+def paginate(request, queryset, per_page, ordering):
+    """Return the requested page of ``queryset`` ordered by ``ordering``.
+
+    Uses keyset pagination (``?cursor=``) when enabled, otherwise the regular
+    numbered ``Paginator`` (``?page=``).
+    """
+    if cursor_pagination_enabled(request):
+        return CursorPaginator(queryset, per_page, ordering).get_page(request.GET.get('cursor'))
+    return Paginator(queryset.order_by(*ordering), per_page).get_page(request.GET.get('page'))
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset paginator over a unique ``ordering`` (which should end in ``id``).
+
+    Pages are fetched with ``WHERE (keys) < (last seen keys) ... LIMIT n + 1``
+    instead of OFFSET, so deep pages cost the same as the first one and no
+    COUNT query is needed. Cursors are signed, so clients can't forge them.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(ordering)
+
+    def get_page(self, cursor=None):
+        position, backwards = self.decode_cursor(cursor)
+        ordering = self.reversed_ordering() if backwards else self.ordering
+        queryset = self.queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return CursorPage(rows, None, None)
+
+        has_next = has_more if not backwards else True
+        has_previous = position is not None if not backwards else has_more
+        return CursorPage(
+            rows,
+            self.encode_cursor(rows[-1], False) if has_next else None,
+            self.encode_cursor(rows[0], True) if has_previous else None,
+        )
+
+    def reversed_ordering(self):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def after(self, ordering, position):
+        # (a, b, c) > (x, y, z) expanded as
+        # a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z),
+        # with > flipped to < for descending keys.
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': position[index]})
+            for prior_field, value in zip(ordering[:index], position):
+                step &= Q(**{prior_field.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def encode_cursor(self, obj, backwards):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            values.append(value.isoformat() if isinstance(value, datetime) else value)
+        return signing.dumps({'o': self.ordering, 'v': values, 'b': backwards}, salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None, False
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+        except signing.BadSignature:
+            return None, False
+        # A cursor from another ordering (e.g. after switching the sort) means
+        # nothing here, so start over
+        if data.get('o') != self.ordering or len(data['v']) != len(self.ordering):
+            return None, False
+        return data['v'], data['b']
@@ -0,0 +1,166 @@
+import re
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+
+class BaseSearchBackend:
+    """Interface for blog full-text search engines.
+
+    ``search`` narrows a Blog queryset to the matches for ``query`` and
+    annotates it with ``search_rank`` (higher is more relevant). ``index`` and
+    ``remove`` keep the engine in sync with individual posts, and
+    ``index_author`` with an author's username; ``rebuild`` re-indexes every
+    post.
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def index(self, blog):
+        pass
+
+    def remove(self, blog_id):
+        pass
+
+    def index_author(self, user):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Unindexed ``icontains`` matching, for databases without full-text support."""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(body__icontains=query) |
+            Q(author__username__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5 index in the ``blog_blog_fts`` virtual table, ranked by bm25.
+
+    The author's username is indexed alongside the title and body so a single
+    MATCH covers everything the search box looks at.
+    """
+
+    table = 'blog_blog_fts'
+
+    def match_expression(self, query):
+        # Quote every term so user input can't inject FTS5 syntax, and
+        # prefix-match the terms so partially typed words still hit.
+        terms = re.findall(r'\w+', query)
+        return ' '.join('"%s"*' % term for term in terms)
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return SimpleSearchBackend().search(queryset, query)
+        return queryset.extra(
+            tables=[self.table],
+            where=[f'{self.table}.rowid = blog_blog.id', f'{self.table} MATCH %s'],
+            params=[match],
+            select={'search_rank': f'-bm25({self.table}, 10.0, 1.0, 5.0)'},
+        )
+
+    def index(self, blog):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [blog.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, body, author) VALUES (%s, %s, %s, %s)',
+                [blog.pk, blog.title, blog.body, blog.author.username]
+            )
+
+    def remove(self, blog_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [blog_id])
+
+    def index_author(self, user):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {self.table} SET author = %s WHERE rowid IN (SELECT id FROM blog_blog WHERE author_id = %s)',
+                [user.username, user.pk]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(SQLITE_REBUILD_SQL)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Generated ``blog_blog.search_vector`` tsvector column behind a GIN index.
+
+    The column is computed by the database on every write from the title, the
+    body and ``search_author``, a copy of the author's username (a generated
+    column can't read other tables), so only that copy is kept in sync from
+    Python.
+    """
+
+    config = 'english'
+
+    def search(self, queryset, query):
+        matches = RawSQL(
+            "blog_blog.search_vector @@ websearch_to_tsquery(%s, %s)",
+            [self.config, query],
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            "ts_rank(blog_blog.search_vector, websearch_to_tsquery(%s, %s))",
+            [self.config, query],
+            output_field=FloatField(),
+        )
+        # A single @@ match, so the GIN index answers the whole filter
+        return queryset.alias(search_match=matches).filter(search_match=True).annotate(search_rank=rank)
+
+    def index(self, blog):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE blog_blog SET search_author = accounts_user.username FROM accounts_user '
+                'WHERE accounts_user.id = blog_blog.author_id AND blog_blog.id = %s '
+                'AND blog_blog.search_author <> accounts_user.username',
+                [blog.pk]
+            )
+
+    def index_author(self, user):
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE blog_blog SET search_author = %s WHERE author_id = %s', [user.username, user.pk])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE blog_blog SET search_author = accounts_user.username FROM accounts_user '
+                'WHERE accounts_user.id = blog_blog.author_id AND blog_blog.search_author <> accounts_user.username'
+            )
+
+
+SQLITE_REBUILD_SQL = (
+    'INSERT INTO blog_blog_fts (rowid, title, body, author) '
+    'SELECT blog_blog.id, blog_blog.title, blog_blog.body, accounts_user.username '
+    'FROM blog_blog INNER JOIN accounts_user ON accounts_user.id = blog_blog.author_id'
+)
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    """Return the backend named by ``BLOG_SEARCH_BACKEND``, or pick one for the database vendor."""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'BLOG_SEARCH_BACKEND', None)
+        if path:
+            _backend = import_string(path)()
+        else:
+            _backend = BACKENDS.get(connection.vendor, SimpleSearchBackend)()
+    return _backend
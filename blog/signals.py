@@ -0,0 +1,197 @@
+import contextvars
+from contextlib import contextmanager
+from functools import partial
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.models import Count, F, Q, QuerySet, Sum
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .caching import bump_version
+from .home_feed import home_feeds
+from .models import Blog, Category, Favorite, Rating, scores_changed
+from .search import get_search_backend
+from .view_counts import view_counts
+
+User = get_user_model()
+
+SEARCHABLE_FIELDS = {'title', 'body', 'author'}
+
+_counters_deferred = contextvars.ContextVar('blog_counters_deferred', default=False)
+
+
+@contextmanager
+def deferred_counters():
+    """Skip the per-row rating and favorite counter updates of the handlers below.
+
+    For batch writes that adjust the counters themselves with
+    Blog.add_to_counters().
+    """
+    token = _counters_deferred.set(True)
+    try:
+        yield
+    finally:
+        _counters_deferred.reset(token)
+
+
+def cascaded(origin):
+    """Whether a delete started from a Blog or User, whose own receivers settle the counters."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in (Blog, User)
+
+
+@receiver(pre_save, sender=Rating)
+@receiver(pre_delete, sender=Rating)
+def load_stored_rating(sender, instance, **kwargs):
+    # Ratings not loaded whole from the database (fixtures, Rating(pk=...),
+    # only()) need their stored blog and score to know what to take off.
+    if instance.pk is not None and None in getattr(instance, '_stored', (None, None)):
+        instance._stored = Rating.objects.filter(pk=instance.pk).values_list('blog_id', 'score').first() or (None, None)
+
+
+@receiver(post_save, sender=Rating)
+def rating_saved(sender, instance, created, **kwargs):
+    # Applies every rating write (rate_blog, admin, shell, fixtures) to the
+    # stored aggregates, as the old and new score's difference.
+    stored_blog_id, stored_score = (None, None) if created else getattr(instance, '_stored', (None, None))
+    instance._stored = (instance.blog_id, instance.score)
+    if _counters_deferred.get():
+        return
+    deltas = {}
+    if stored_score is not None:
+        deltas[stored_blog_id] = {'rating_sum': -stored_score, 'rating_count': -1}
+    delta = deltas.setdefault(instance.blog_id, {'rating_sum': 0, 'rating_count': 0})
+    delta['rating_sum'] += instance.score
+    delta['rating_count'] += 1
+    Blog.add_to_counters(deltas)
+
+
+@receiver(post_delete, sender=Rating)
+def rating_deleted(sender, instance, origin=None, **kwargs):
+    if _counters_deferred.get() or cascaded(origin):
+        return
+    blog_id, score = instance._stored
+    if score is not None:
+        Blog.add_to_counters({blog_id: {'rating_sum': -score, 'rating_count': -1}})
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_saved(sender, instance, created, **kwargs):
+    if created and not _counters_deferred.get():
+        Blog.objects.filter(pk=instance.blog_id).update(favorite_count=F('favorite_count') + 1)
+        Blog.update_trending_scores([instance.blog_id])
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, origin=None, **kwargs):
+    if _counters_deferred.get() or cascaded(origin):
+        return
+    Blog.objects.filter(pk=instance.blog_id).update(favorite_count=F('favorite_count') - 1)
+    Blog.update_trending_scores([instance.blog_id])
+
+
+@receiver(post_save, sender=Blog)
+def blog_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is None or SEARCHABLE_FIELDS & set(update_fields):
+        get_search_backend().index(instance)
+    bump_version('filter_authors')
+    bump_version('blog_detail')
+    transaction.on_commit(partial(home_feeds.refresh, [instance.pk], created=created))
+
+
+@receiver(post_delete, sender=Blog)
+def blog_deleted(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+    bump_version('filter_authors')
+    bump_version('blog_detail')
+    transaction.on_commit(partial(home_feeds.refresh, [instance.pk]))
+
+
+# Ratings, favorites and buffered views all end in Blog.update_trending_scores().
+
+@receiver(scores_changed)
+def blog_scores_changed(sender, blog_ids, **kwargs):
+    transaction.on_commit(partial(home_feeds.refresh, blog_ids, scores_only=True))
+
+
+@receiver(request_started)
+def flush_view_counts(sender, **kwargs):
+    # After Django's own request_started handler has recycled stale
+    # connections, so the flush uses this request's connection
+    view_counts.flush_if_due()
+
+
+# Blog cards vary on the blog's own updated_at and rating aggregates, so only
+# changes to the category and author shown on them need a global bump.
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, **kwargs):
+    bump_version('filter_categories')
+    bump_version('blog_card')
+    bump_version('blog_detail')
+    # A deleted category is unset on its blogs without Blog signals
+    home_feeds.clear()
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # The user's ratings and favorites on other authors' blogs come off
+    # their counters in one update once the cascade is done; the user's own
+    # blogs go with them.
+    others = Q(user=instance) & ~Q(blog__author=instance)
+    deltas = {}
+    for blog_id, score_sum, count in Rating.objects.filter(others).values_list('blog').annotate(Sum('score'), Count('id')):
+        deltas[blog_id] = {'rating_sum': -score_sum, 'rating_count': -count}
+    for blog_id, count in Favorite.objects.filter(others).values_list('blog').annotate(Count('id')):
+        deltas.setdefault(blog_id, {})['favorite_count'] = -count
+    instance._counter_deltas = deltas
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    Blog.add_to_counters(getattr(instance, '_counter_deltas', {}))
+    if instance.role in AUTHOR_ROLES:
+        bump_version('filter_authors')
+        bump_version('blog_card')
+        bump_version('blog_detail')
+
+
+# What blog pages show of a user, and the cached data sets showing it. Only
+# authors' and admins' changes to these need a global bump.
+USER_SHOWN_FIELDS = {
+    'username': ('filter_authors', 'blog_card', 'blog_detail'),
+    'first_name': ('filter_authors', 'blog_card', 'blog_detail'),
+    'last_name': ('filter_authors', 'blog_card', 'blog_detail'),
+    'profile_picture': ('blog_card', 'blog_detail'),
+    'bio': ('blog_detail',),
+    'role': ('filter_authors',),
+}
+AUTHOR_ROLES = ('author', 'admin')
+
+
+@receiver(pre_save, sender=User)
+def load_stored_user(sender, instance, update_fields=None, **kwargs):
+    # The shown fields as stored, to tell what this save changes
+    fields = USER_SHOWN_FIELDS.keys() if update_fields is None else USER_SHOWN_FIELDS.keys() & set(update_fields)
+    instance._stored = None
+    if instance.pk is not None and fields:
+        instance._stored = User.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, **kwargs):
+    stored = getattr(instance, '_stored', None)
+    if not stored:
+        return
+    changed = {
+        field for field, value in stored.items()
+        # File fields come back as names; compare empty ones as ''
+        if (value or '') != (str(getattr(instance, field)) or '')
+    }
+    if 'username' in changed:
+        get_search_backend().index_author(instance)
+    if instance.role not in AUTHOR_ROLES and stored.get('role', instance.role) not in AUTHOR_ROLES:
+        return
+    for name in {name for field in changed for name in USER_SHOWN_FIELDS[field]}:
+        bump_version(name)
@@ -0,0 +1,138 @@
+import os
+import tempfile
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Max, Q
+from django.urls import reverse
+from django.utils.xmlutils import SimplerXMLGenerator
+from .models import Blog, Category
+
+User = get_user_model()
+
+SITEMAP_NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+INDEX_NAME = 'sitemap.xml'
+PAGE_NAME = 'sitemap-%s-%d.xml'
+
+
+def sitemap_root():
+    return str(getattr(settings, 'BLOG_SITEMAP_ROOT', settings.BASE_DIR / 'sitemaps'))
+
+
+def by_keyset(queryset, batch_size):
+    """Yield the objects of ``queryset`` in primary key order, ``batch_size`` per query.
+
+    Each batch starts after the last primary key seen, so every query is an
+    index range scan however far in it is, and only one batch is in memory.
+    """
+    last_pk = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        objects = list(batch[:batch_size])
+        yield from objects
+        if len(objects) < batch_size:
+            return
+        last_pk = objects[-1].pk
+
+
+def blog_entries(batch_size):
+    blogs = Blog.objects.filter(status='published').only('slug', 'updated_at')
+    for blog in by_keyset(blogs, batch_size):
+        yield blog.get_absolute_url(), blog.updated_at
+
+
+def category_entries(batch_size):
+    categories = Category.objects.annotate(
+        lastmod=Max('blog__updated_at', filter=Q(blog__status='published'))
+    ).filter(lastmod__isnull=False).only('pk')
+    home = reverse('blog:home')
+    for category in by_keyset(categories, batch_size):
+        yield f'{home}?category={category.pk}', category.lastmod
+
+
+def author_entries(batch_size):
+    authors = User.objects.filter(role__in=['author', 'admin']).annotate(
+        lastmod=Max('blogs__updated_at', filter=Q(blogs__status='published'))
+    ).filter(lastmod__isnull=False).only('username')
+    for author in by_keyset(authors, batch_size):
+        yield reverse('accounts:author_detail', args=[author.username]), author.lastmod
+
+
+SECTIONS = {
+    'blogs': blog_entries,
+    'categories': category_entries,
+    'authors': author_entries,
+}
+
+
+class SitemapFile:
+    """One sitemap or sitemap index document, written to ``path`` as entries arrive."""
+
+    def __init__(self, path, root_element, entry_element):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.handler = SimplerXMLGenerator(self.file, 'utf-8', short_empty_elements=True)
+        self.root_element = root_element
+        self.entry_element = entry_element
+        self.count = 0
+        self.lastmod = None
+        self.handler.startDocument()
+        self.handler.startElement(root_element, {'xmlns': SITEMAP_NAMESPACE})
+
+    def add(self, location, lastmod):
+        self.handler.startElement(self.entry_element, {})
+        self.handler.addQuickElement('loc', location)
+        if lastmod is not None:
+            self.handler.addQuickElement('lastmod', lastmod.isoformat(timespec='seconds'))
+            self.lastmod = max(self.lastmod or lastmod, lastmod)
+        self.handler.endElement(self.entry_element)
+        self.count += 1
+
+    def close(self):
+        self.handler.endElement(self.root_element)
+        self.file.close()
+
+
+def write_sitemaps(base_url, root=None, limit=None, batch_size=2000):
+    """Write the sitemap index and the paginated sitemaps of every section under ``root``.
+
+    Files are written to a scratch directory and moved into place one by
+    one, the index last, so crawlers never see a half-written file. Pages
+    left over from a larger previous run are removed. Returns
+    ``{file name: number of entries}``.
+    """
+    root = root or sitemap_root()
+    limit = limit or getattr(settings, 'BLOG_SITEMAP_LIMIT', 50000)
+    base_url = base_url.rstrip('/')
+    os.makedirs(root, exist_ok=True)
+
+    written = {}
+    with tempfile.TemporaryDirectory(dir=root) as scratch:
+        index = SitemapFile(os.path.join(scratch, INDEX_NAME), 'sitemapindex', 'sitemap')
+        pages = []
+        for section, entries in SECTIONS.items():
+            page, number = None, 0
+            for location, lastmod in entries(batch_size):
+                if page is None or page.count >= limit:
+                    if page is not None:
+                        page.close()
+                    number += 1
+                    name = PAGE_NAME % (section, number)
+                    page = SitemapFile(os.path.join(scratch, name), 'urlset', 'url')
+                    pages.append((name, page))
+                page.add(base_url + location, lastmod)
+            if page is not None:
+                page.close()
+
+        for name, page in pages:
+            index.add(f'{base_url}/{name}', page.lastmod)
+            written[name] = page.count
+            os.replace(os.path.join(scratch, name), os.path.join(root, name))
+        index.close()
+        written[INDEX_NAME] = index.count
+        os.replace(os.path.join(scratch, INDEX_NAME), os.path.join(root, INDEX_NAME))
+
+    for name in os.listdir(root):
+        if name.startswith('sitemap-') and name.endswith('.xml') and name not in written:
+            os.remove(os.path.join(root, name))
+    return written
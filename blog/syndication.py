@@ -0,0 +1,200 @@
+import io
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed, rfc3339_date
+from django.utils.xmlutils import SimplerXMLGenerator
+from .caching import fragment_timeout, record, versions_state
+
+FEED_KEY = 'blog:syndication:%s:%s:%s:%s'
+
+
+class StreamingFeedMixin:
+    """Write a feedgenerator feed one item at a time.
+
+    ``stream()`` consumes its items lazily and yields the document in
+    pieces, so a feed never holds more than one blog in memory. The feed's
+    ``updated`` date stands in for latest_post_date(), which would need all
+    items up front.
+    """
+
+    def __init__(self, *args, updated=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.updated = updated
+
+    def latest_post_date(self):
+        return self.updated or super().latest_post_date()
+
+    def stream(self, items):
+        buffer = io.StringIO()
+        handler = SimplerXMLGenerator(buffer, 'utf-8', short_empty_elements=True)
+        handler.startDocument()
+        self.start_root(handler)
+        self.add_root_elements(handler)
+        yield self.drain(buffer)
+        for item in items:
+            # add_item() normalizes the item's fields
+            self.add_item(**item)
+            item = self.items.pop()
+            handler.startElement(self.item_element, self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_element)
+            yield self.drain(buffer)
+        self.end_root(handler)
+        yield self.drain(buffer)
+
+    def drain(self, buffer):
+        content = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return content
+
+
+class RssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    item_element = 'item'
+
+    def start_root(self, handler):
+        self.add_stylesheets(handler)
+        handler.startElement('rss', self.rss_attributes())
+        handler.startElement('channel', self.root_attributes())
+
+    def end_root(self, handler):
+        self.endChannelElement(handler)
+        handler.endElement('rss')
+
+
+class AtomFeed(StreamingFeedMixin, Atom1Feed):
+    item_element = 'entry'
+
+    def start_root(self, handler):
+        handler.startElement('feed', self.root_attributes())
+
+    def end_root(self, handler):
+        handler.endElement('feed')
+
+
+class JsonFeed:
+    """JSON Feed 1.1 (https://jsonfeed.org/version/1.1), streamed like the XML feeds."""
+
+    content_type = 'application/feed+json; charset=utf-8'
+
+    def __init__(self, title, link, description, feed_url, updated=None):
+        self.meta = {
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': title,
+            'home_page_url': link,
+            'feed_url': feed_url,
+            'description': description,
+        }
+
+    def stream(self, items):
+        # Everything up to the opening bracket of the items array
+        yield json.dumps({**self.meta, 'items': []})[:-2]
+        for number, item in enumerate(items):
+            yield (',' if number else '') + json.dumps(self.item(item))
+        yield ']}'
+
+    def item(self, item):
+        entry = {
+            'id': item['unique_id'],
+            'url': item['link'],
+            'title': item['title'],
+            'summary': item['description'],
+            'date_published': rfc3339_date(item['pubdate']),
+            'date_modified': rfc3339_date(item['updateddate']),
+            'authors': [{'name': item['author_name'], 'url': item['author_link']}],
+        }
+        if item['categories']:
+            entry['tags'] = list(item['categories'])
+        return entry
+
+
+FEED_FORMATS = {
+    'rss': RssFeed,
+    'atom': AtomFeed,
+    'json': JsonFeed,
+}
+
+
+def feed_page_state(request, key, format, blogs):
+    """State for ``conditional_page`` of the ``format`` feed ``key`` of ``blogs``.
+
+    Publishing, editing or deleting a blog and renaming a category or author
+    all bump ``blog_detail``, so polls are validated without a query. Without
+    a shared cache, they are validated on the newest edit and the count of
+    ``blogs``; renames then show with the next edit.
+    """
+    if format not in FEED_FORMATS:
+        return None
+    state = versions_state('blog_detail')
+    if state is None:
+        posts = blogs.aggregate(newest=Max('updated_at'), count=Count('id'))
+        state = posts['newest'], (posts['newest'], posts['count'])
+    last_modified, versions = state
+    return last_modified, (key, format, versions)
+
+
+def feed_items(request, blogs):
+    limit = getattr(settings, 'BLOG_SYNDICATION_ITEMS', 20)
+    blogs = blogs.select_related('author', 'category').only(
+        'title', 'slug', 'excerpt', 'created_at', 'updated_at',
+        'author__username', 'author__first_name', 'author__last_name', 'category__name',
+    ).order_by('-created_at', '-id')[:limit]
+    for blog in blogs.iterator(chunk_size=limit):
+        link = request.build_absolute_uri(blog.get_absolute_url())
+        yield {
+            'title': blog.title,
+            'link': link,
+            'description': blog.excerpt,
+            'author_name': blog.author.get_full_name() or blog.author.username,
+            'author_link': request.build_absolute_uri(reverse('accounts:author_detail', args=[blog.author.username])),
+            'pubdate': blog.created_at,
+            'updateddate': blog.updated_at,
+            'unique_id': link,
+            'categories': [blog.category.name] if blog.category else (),
+        }
+
+
+def feed_response(request, key, blogs, format, title, link, description):
+    """Stream the ``format`` feed of the latest published ``blogs``.
+
+    With a shared cache, the feed is cached under ``key`` once fully sent,
+    until a blog, category or author changes; later requests get the cached
+    copy.
+    """
+    feed_class = FEED_FORMATS.get(format)
+    if feed_class is None:
+        raise Http404('Unknown feed format.')
+    state = versions_state('blog_detail')
+    updated, cache_key = None, None
+    if state is not None:
+        updated, versions = state
+        # Links in the feed are absolute, so it is cached per host
+        cache_key = FEED_KEY % (request.get_host(), key, format, versions[0])
+        content = cache.get(cache_key)
+        record('syndication', content is not None)
+        if content is not None:
+            return HttpResponse(content, content_type=feed_class.content_type)
+
+    feed = feed_class(
+        title=title,
+        link=request.build_absolute_uri(link),
+        description=description,
+        feed_url=request.build_absolute_uri(),
+        updated=updated,
+    )
+    chunks = feed.stream(feed_items(request, blogs))
+    if cache_key is not None:
+        chunks = cache_when_sent(cache_key, chunks)
+    return StreamingHttpResponse(chunks, content_type=feed_class.content_type)
+
+
+def cache_when_sent(key, chunks):
+    sent = []
+    for chunk in chunks:
+        sent.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(sent), fragment_timeout())
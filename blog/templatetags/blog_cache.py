@@ -0,0 +1,37 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+from blog.caching import get_or_set
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        return get_or_set(self.fragment_name, key, lambda: self.nodelist.render(context))
+
+
+@register.tag('cachefragment')
+def do_cachefragment(parser, token):
+    """
+    Cache the enclosed template fragment under ``fragment_name`` and the
+    resolved ``vary_on`` values, counting hits and misses::
+
+        {% cachefragment blog_card blog.pk blog.updated_at %}
+            ...
+        {% endcachefragment %}
+
+    Fragments are never invalidated explicitly; vary on whatever changes them.
+    """
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 2:
+        raise template.TemplateSyntaxError(f"'{tokens[0]}' tag requires at least 1 argument.")
+    return CachedFragmentNode(nodelist, tokens[1], [parser.compile_filter(t) for t in tokens[2:]])
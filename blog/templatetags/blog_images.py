@@ -0,0 +1,45 @@
+import logging
+from django import template
+from django.utils.html import format_html, format_html_join
+from blog.images import DERIVATIVE_ERRORS, get_preset_derivatives
+
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, preset, sizes=None, **attrs):
+    """
+    Render an ``<img>`` for an ImageField using the resized derivatives of
+    ``preset`` (see ``blog.images.PRESETS``) as its ``srcset``::
+
+        {% responsive_image blog.featured_image 'card' alt=blog.title class="card-img-top" %}
+
+    ``width``/``height`` come from the smallest derivative, which should
+    match the size the image is displayed at. Falls back to the original
+    file if the derivatives can't be built.
+    """
+    if not image:
+        return ''
+    try:
+        derivatives = get_preset_derivatives(image, preset)
+    except DERIVATIVE_ERRORS:
+        logger.exception('Could not build %s derivatives for %s', preset, image.name)
+        return format_html('<img src="{}"{}>', image.url, render_attrs(attrs))
+
+    url, width, height = derivatives[0]
+    candidates = {}
+    for candidate_url, candidate_width, _ in derivatives:
+        # Small originals aren't upscaled, so several widths can collapse to one
+        candidates.setdefault(candidate_width, candidate_url)
+    srcset = ', '.join(f'{candidate_url} {w}w' for w, candidate_url in candidates.items())
+    attrs.setdefault('loading', 'lazy')
+    return format_html(
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" decoding="async"{}>',
+        url, srcset, sizes or f'{width}px', width, height, render_attrs(attrs)
+    )
+
+
+def render_attrs(attrs):
+    return format_html_join('', ' {}="{}"', attrs.items())
@@ -0,0 +1,686 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO, StringIO
+from unittest import mock
+from PIL import Image
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from notifications.models import OutgoingEmail
+from .home_feed import home_feeds
+from .templatetags.blog_images import responsive_image
+from .models import Blog, Category, Favorite, Rating
+from .pagination import CursorPaginator
+from .view_counts import ViewCountBuffer
+
+User = get_user_model()
+
+# Tests run with DEBUG off and without collectstatic, so there is no manifest
+# for templates to look static files up in. Views are written through, so no
+# hit outlives the test database in the buffer.
+test_settings = override_settings(
+    STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+    BLOG_VIEW_COUNT_FLUSH_INTERVAL=0,
+)
+
+
+def create_blogs(count=5):
+    author = User.objects.create_user('author', 'author@example.com', 'password', role='author')
+    reader = User.objects.create_user('reader', 'reader@example.com', 'password')
+    category = Category.objects.create(name='Python')
+    blogs = [
+        Blog.objects.create(
+            title=f'Post {number}', body='Some words to read.', author=author,
+            category=category if number % 2 else None, status='published',
+        )
+        for number in range(count)
+    ]
+    Favorite.objects.create(user=reader, blog=blogs[0])
+    return author, blogs
+
+
+@test_settings
+class FeedQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_blogs()
+
+    def test_feed_queries_use_their_indexes(self):
+        out = StringIO()
+        # Raises CommandError listing the queries whose plan misses their index
+        call_command('explain_feed_queries', stdout=out)
+        self.assertNotIn('MISS', out.getvalue())
+
+
+@test_settings
+class SlugAllocationTests(TransactionTestCase):
+    def test_concurrent_same_title_posts_get_unique_slugs(self):
+        author = User.objects.create_user('author', 'author@example.com', 'password', role='author')
+        threads, posts = 4, 5
+        slugs, errors = [], []
+
+        def create():
+            # The in-memory test database fails on a locked table rather
+            # than waiting, which a file or server database would do
+            while True:
+                try:
+                    return Blog.objects.create(title='Same', author=author, body='x', status='published')
+                except OperationalError as error:
+                    if 'locked' not in str(error):
+                        raise
+                    time.sleep(0.001)
+
+        def worker():
+            try:
+                for _ in range(posts):
+                    slugs.append(create().slug)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(slugs)), threads * posts)
+        self.assertEqual(Blog.objects.filter(title='Same').count(), threads * posts)
+
+    def test_numeric_suffix_past_integer_range(self):
+        author = User.objects.create_user('author', 'author@example.com', 'password', role='author')
+        Blog.objects.create(title='Same', body='x', author=author, status='published')
+        Blog.objects.create(title='Same', body='x', author=author, status='published', slug='same-41')
+        Blog.objects.create(title='Same', body='x', author=author, status='published', slug='same-' + '9' * 25)
+        blog = Blog.objects.create(title='Same', body='x', author=author, status='published')
+        self.assertEqual(blog.slug, 'same-42')
+
+
+@test_settings
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.blogs = create_blogs(2)
+        cls.reader = User.objects.get(username='reader')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'password')
+
+    def counters(self, blog):
+        blog.refresh_from_db()
+        return blog.rating_sum, blog.rating_count, blog.favorite_count
+
+    def test_rating_signals(self):
+        blog = self.blogs[0]
+        rating, created = blog.rate(self.reader, 6)
+        self.assertTrue(created)
+        blog.rate(self.other, 2)
+        self.assertEqual(self.counters(blog), (8, 2, 1))
+        self.assertAlmostEqual(blog.rating_score, (3.0 * 5 + 8) / 7)
+
+        blog.rate(self.reader, 4)
+        self.assertEqual(self.counters(blog), (6, 2, 1))
+
+        # Moving a rating to another blog takes it off the first
+        rating.refresh_from_db()
+        rating.blog = self.blogs[1]
+        rating.save()
+        self.assertEqual(self.counters(blog), (2, 1, 1))
+        self.assertEqual(self.counters(self.blogs[1]), (4, 1, 0))
+
+        Rating.objects.get(user=self.other).delete()
+        self.assertEqual(self.counters(blog), (0, 0, 1))
+        self.assertEqual(blog.rating_score, 3.0)
+
+    def test_favorite_signals(self):
+        blog = self.blogs[0]
+        self.assertTrue(blog.toggle_favorite(self.other))
+        self.assertEqual(self.counters(blog)[2], 2)
+        self.assertFalse(blog.toggle_favorite(self.reader))
+        self.assertEqual(self.counters(blog)[2], 1)
+
+    def test_add_to_counters(self):
+        first, second = self.blogs
+        trending = second.trending_score
+        Blog.add_to_counters({
+            first.pk: {'rating_sum': 5, 'rating_count': 1},
+            second.pk: {'favorite_count': 2},
+        })
+        self.assertEqual(self.counters(first), (5, 1, 1))
+        self.assertAlmostEqual(first.rating_score, (3.0 * 5 + 5) / 6)
+        self.assertEqual(self.counters(second), (0, 0, 2))
+        self.assertGreater(second.trending_score, trending)
+
+        with self.assertNumQueries(0):
+            Blog.add_to_counters({first.pk: {'rating_sum': 0}})
+
+    def test_stale_save_keeps_counters(self):
+        stale = Blog.objects.get(pk=self.blogs[0].pk)
+        self.blogs[0].toggle_favorite(self.other)
+        self.blogs[0].rate(self.other, 5)
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertEqual(self.counters(stale), (5, 1, 2))
+        self.assertEqual(stale.title, 'Renamed')
+
+    def test_user_delete_takes_their_ratings_and_favorites_off(self):
+        first, second = self.blogs
+        first.rate(self.reader, 6)
+        second.rate(self.reader, 3)
+        second.toggle_favorite(self.reader)
+        first.rate(self.other, 1)
+        self.reader.delete()
+        self.assertEqual(self.counters(first), (1, 1, 0))
+        self.assertEqual(self.counters(second), (0, 0, 0))
+
+    def test_author_delete_takes_their_blogs(self):
+        self.blogs[0].rate(self.other, 4)
+        self.author.delete()
+        self.assertFalse(Blog.objects.exists())
+        self.assertFalse(Rating.objects.exists())
+
+
+@test_settings
+class BulkApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.blogs = create_blogs(3)
+        cls.reader = User.objects.get(username='reader')
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def post(self, url, data):
+        return self.client.post(url, data, content_type='application/json')
+
+    def counters(self, blog):
+        blog.refresh_from_db()
+        return blog.rating_sum, blog.rating_count, blog.favorite_count
+
+    def test_bulk_rate(self):
+        first, second, third = self.blogs
+        response = self.post('/api/ratings/', {'ratings': [
+            {'slug': first.slug, 'score': 6}, {'slug': second.slug, 'score': 2}, {'slug': 'nope', 'score': 1},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['missing'], ['nope'])
+        self.assertEqual(data['blogs'][first.slug]['user_rating'], 6)
+        self.assertEqual(self.counters(first), (6, 1, 1))
+
+        # Rating again replaces the score rather than adding a rating
+        self.post('/api/ratings/', {'ratings': [{'slug': first.slug, 'score': 3}, {'slug': third.slug, 'score': 0}]})
+        self.assertEqual(self.counters(first), (3, 1, 1))
+        self.assertEqual(self.counters(second), (2, 1, 0))
+        self.assertEqual(self.counters(third), (0, 1, 0))
+        self.assertAlmostEqual(first.rating_score, (3.0 * 5 + 3) / 6)
+
+    def test_bulk_favorites(self):
+        first, second, third = self.blogs
+        response = self.post('/api/favorites/', {'add': [second.slug, third.slug, 'nope'], 'remove': [first.slug]})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['added'], sorted([second.slug, third.slug]))
+        self.assertEqual(data['removed'], [first.slug])
+        self.assertEqual(data['missing'], ['nope'])
+        self.assertEqual([self.counters(blog)[2] for blog in self.blogs], [0, 1, 1])
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+
+        # Favorites already in place change nothing and send nothing
+        data = self.post('/api/favorites/', {'add': [second.slug], 'remove': [first.slug]}).json()
+        self.assertEqual((data['added'], data['removed']), ([], []))
+        self.assertEqual([self.counters(blog)[2] for blog in self.blogs], [0, 1, 1])
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+
+    @override_settings(BLOG_BULK_API_MAX_ITEMS=2)
+    def test_bad_requests(self):
+        slug = self.blogs[0].slug
+        for url, data in (
+            ('/api/ratings/', 'not json'),
+            ('/api/ratings/', ['a list']),
+            ('/api/ratings/', {'ratings': [{'slug': slug, 'score': 7}]}),
+            ('/api/ratings/', {'ratings': [{'slug': slug, 'score': True}]}),
+            ('/api/ratings/', {'ratings': [{'slug': slug, 'score': 1}] * 3}),
+            ('/api/favorites/', {'add': slug}),
+            ('/api/favorites/', {'add': [slug], 'remove': [slug]}),
+        ):
+            with self.subTest(url=url, data=data):
+                response = self.post(url, data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        self.assertEqual(self.counters(self.blogs[0]), (0, 0, 1))
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.post('/api/ratings/', {'ratings': []})
+        self.assertEqual(response.status_code, 302)
+
+
+@test_settings
+@override_settings(BLOG_CACHE_SHARED=True)
+class HomeFeedCacheTests(TestCase):
+    ordering = ['-rating_score', '-created_at', '-id']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.blogs = create_blogs(4)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def published(self):
+        return Blog.objects.filter(status='published')
+
+    def row(self, blog):
+        fields = [field[1:] for field in self.ordering]
+        return self.published().filter(pk=blog.pk).values('status', 'category_id', 'author_id', *fields).first()
+
+    def expected(self, queryset=None):
+        return list((queryset or self.published()).order_by(*self.ordering).values_list('id', flat=True))
+
+    def ids(self, feed):
+        return [-entry[-1] for entry in feed['entries']]
+
+    def test_apply_moves_a_blog_to_its_new_place(self):
+        feed = home_feeds.build(self.published().order_by(*self.ordering), self.ordering, None, None)
+        last = Blog.objects.get(pk=self.expected()[-1])
+        Blog.add_to_counters({last.pk: {'rating_sum': 6, 'rating_count': 1}})
+        self.assertIs(home_feeds.apply(feed, last.pk, self.row(last), False, True), True)
+        self.assertEqual(self.ids(feed), self.expected())
+        self.assertEqual(feed['count'], 4)
+        # Already in place
+        self.assertIs(home_feeds.apply(feed, last.pk, self.row(last), False, True), False)
+
+    def test_apply_adds_and_removes_members(self):
+        category = self.blogs[1].category
+        feed = home_feeds.build(self.published().filter(category=category).order_by(*self.ordering), self.ordering,
+                                category.pk, None)
+        self.assertEqual(feed['count'], 2)
+        # Another category's blog isn't a member
+        self.assertIs(home_feeds.apply(feed, self.blogs[0].pk, self.row(self.blogs[0]), False, False), False)
+
+        Blog.objects.filter(pk=self.blogs[0].pk).update(category=category)
+        self.assertIs(home_feeds.apply(feed, self.blogs[0].pk, self.row(self.blogs[0]), False, False), True)
+        Blog.objects.filter(pk=self.blogs[1].pk).delete()
+        self.assertIs(home_feeds.apply(feed, self.blogs[1].pk, None, False, False), True)
+        self.assertEqual(self.ids(feed), self.expected(self.published().filter(category=category)))
+        self.assertEqual(feed['count'], 2)
+
+    @override_settings(BLOG_HOME_FEED_DEPTH=2)
+    def test_apply_on_a_truncated_feed(self):
+        feed = home_feeds.build(self.published().order_by(*self.ordering), self.ordering, None, None)
+        self.assertEqual((len(feed['entries']), feed['complete'], feed['count']), (2, False, 4))
+        hidden = Blog.objects.get(pk=self.expected()[-1])
+        # Could have been anywhere past the entries, or nowhere
+        self.assertIsNone(home_feeds.apply(feed, hidden.pk, self.row(hidden), False, False))
+
+        # A new blog sorting past the last entry is only counted
+        Blog.objects.filter(pk=hidden.pk).update(created_at=self.blogs[0].created_at.replace(year=2000))
+        self.assertIs(home_feeds.apply(feed, hidden.pk, self.row(hidden), True, False), True)
+        self.assertEqual((len(feed['entries']), feed['count']), (2, 5))
+
+        # A rated one moves in and pushes the last entry out
+        Blog.add_to_counters({hidden.pk: {'rating_sum': 6, 'rating_count': 1}})
+        self.assertIs(home_feeds.apply(feed, hidden.pk, self.row(hidden), False, True), True)
+        self.assertEqual(self.ids(feed)[0], hidden.pk)
+        self.assertEqual(len(feed['entries']), 2)
+
+    def test_refresh_updates_cached_feeds(self):
+        page = home_feeds.get_page(self.published(), self.ordering, None, None, 1, 6)
+        self.assertEqual([blog.pk for blog in page], self.expected())
+
+        last = self.expected()[-1]
+        with self.captureOnCommitCallbacks(execute=True):
+            Blog.add_to_counters({last: {'rating_sum': 6, 'rating_count': 1}})
+            blog = Blog.objects.create(title='New', body='x', author=self.author, status='published')
+        # Served from the updated feed rather than rebuilt
+        with self.assertNumQueries(1):
+            page = home_feeds.get_page(self.published(), self.ordering, None, None, 1, 6)
+        self.assertEqual([blog.pk for blog in page], self.expected())
+        self.assertEqual(page.paginator.count, 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            blog.delete()
+        with self.assertNumQueries(1):
+            page = home_feeds.get_page(self.published(), self.ordering, None, None, 1, 6)
+        self.assertEqual([blog.pk for blog in page], self.expected())
+
+
+class CursorPaginatorTests(TestCase):
+    ordering = ['-views', '-created_at', '-id']
+
+    @classmethod
+    def setUpTestData(cls):
+        blogs = create_blogs(5)[1]
+        # Ties on the leading keys, so the later ones decide
+        Blog.objects.update(created_at=blogs[0].created_at)
+        Blog.objects.filter(pk__in=[blogs[1].pk, blogs[3].pk]).update(views=5)
+        cls.expected = list(Blog.objects.order_by(*cls.ordering).values_list('pk', flat=True))
+
+    def get_page(self, cursor=None, ordering=None):
+        return CursorPaginator(Blog.objects.all(), 2, ordering or self.ordering).get_page(cursor)
+
+    def pks(self, page):
+        return [blog.pk for blog in page]
+
+    def test_walks_forwards_and_back(self):
+        first = self.get_page()
+        self.assertEqual(self.pks(first), self.expected[:2])
+        self.assertFalse(first.has_previous())
+
+        second = self.get_page(first.next_cursor)
+        third = self.get_page(second.next_cursor)
+        self.assertEqual(self.pks(second), self.expected[2:4])
+        self.assertEqual(self.pks(third), self.expected[4:])
+        self.assertFalse(third.has_next())
+
+        self.assertEqual(self.pks(self.get_page(third.previous_cursor)), self.expected[2:4])
+        back = self.get_page(second.previous_cursor)
+        self.assertEqual(self.pks(back), self.expected[:2])
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_takes_one_query(self):
+        cursor = self.get_page().next_cursor
+        with self.assertNumQueries(1):
+            self.pks(self.get_page(cursor))
+
+    def test_cursor_from_another_ordering_starts_over(self):
+        cursor = self.get_page(ordering=['-created_at', '-id']).next_cursor
+        self.assertEqual(self.pks(self.get_page(cursor)), self.expected[:2])
+
+    def test_tampered_cursor_starts_over(self):
+        cursor = self.get_page().next_cursor
+        for bad in (cursor[:-1] + ('A' if cursor[-1] != 'A' else 'B'), 'nonsense'):
+            with self.subTest(cursor=bad):
+                self.assertEqual(self.pks(self.get_page(bad)), self.expected[:2])
+
+
+@test_settings
+class ViewCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.blogs = create_blogs(2)
+
+    def setUp(self):
+        self.buffer = ViewCountBuffer()
+
+    def views(self, blog):
+        blog.refresh_from_db(fields=['views'])
+        return blog.views
+
+    def test_write_through(self):
+        blog = self.blogs[0]
+        self.assertEqual(self.buffer.record(blog.pk), 0)
+        self.assertEqual(async_to_sync(self.buffer.arecord)(blog.pk), 0)
+        self.assertEqual(self.views(blog), 2)
+        self.assertEqual(self.buffer.pending(blog.pk), 0)
+
+    @override_settings(BLOG_VIEW_COUNT_FLUSH_INTERVAL=30)
+    def test_buffered_hits_are_flushed_in_one_update(self):
+        first, second = self.blogs
+        self.assertEqual(self.buffer.record(first.pk), 1)
+        self.assertEqual(self.buffer.record(first.pk), 2)
+        self.assertEqual(async_to_sync(self.buffer.arecord)(second.pk), 1)
+        self.assertEqual(self.views(first), 0)
+        self.assertEqual(self.buffer.pending(first.pk), 2)
+
+        with self.assertNumQueries(3):  # the UPDATE, then the trending scores' lookup and UPDATE
+            self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual((self.views(first), self.views(second)), (2, 1))
+        self.assertEqual(self.buffer.pending(first.pk), 0)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    @override_settings(BLOG_VIEW_COUNT_FLUSH_INTERVAL=30)
+    def test_flushed_by_the_first_request_after_the_interval(self):
+        blog = self.blogs[0]
+        with mock.patch('blog.signals.view_counts', self.buffer):
+            self.buffer.record(blog.pk)
+            self.client.get('/')
+            self.assertEqual(self.buffer.pending(blog.pk), 1)
+
+            self.buffer._since -= 30
+            self.client.get('/')
+        self.assertEqual(self.buffer.pending(blog.pk), 0)
+        self.assertEqual(self.views(blog), 1)
+
+
+@test_settings
+class PageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.blogs = create_blogs()
+
+    def test_pages_render(self):
+        for url in ('/', self.blogs[0].get_absolute_url(), '/feed/rss/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_reading_time_is_shown(self):
+        blog = Blog.objects.create(title='Long', body='word ' * 1000, author=self.author, status='published')
+        for url in ('/', blog.get_absolute_url()):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), '5 min read')
+
+    @override_settings(BLOG_CACHE_SHARED=True)
+    def test_anonymous_cache_miss_query_count(self):
+        # The blog and its author's other posts, plus the view written through
+        with self.assertNumQueries(3):
+            response = self.client.get(self.blogs[0].get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(2):
+            self.client.get(self.blogs[0].get_absolute_url(), headers={'If-None-Match': response['ETag']})
+
+
+    def assertRevalidates(self, url, change):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': response['ETag']}).status_code, 304)
+        change()
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': response['ETag']}).status_code, 200)
+
+    def test_detail_revalidates_without_a_shared_cache(self):
+        blog, other = self.blogs[0], self.blogs[1]
+
+        def retitle_other_post():
+            other.title = 'Retitled'
+            other.save()
+
+        def rename_author():
+            self.author.first_name = 'Ada'
+            self.author.save()
+
+        for change in (retitle_other_post, rename_author):
+            with self.subTest(change=change.__name__):
+                self.assertRevalidates(blog.get_absolute_url(), change)
+
+    def test_author_page_revalidates_without_a_shared_cache(self):
+        url = f'/accounts/author/{self.author.username}/'
+
+        def rate_post():
+            self.blogs[2].rate(User.objects.get(username='reader'), 5)
+
+        def change_profile():
+            self.author.website = 'https://example.com'
+            self.author.save()
+
+        for change in (rate_post, change_profile):
+            with self.subTest(change=change.__name__):
+                self.assertRevalidates(url, change)
+
+
+    def test_feed_revalidates_without_a_shared_cache(self):
+        def publish():
+            Blog.objects.create(title='New', body='x', author=self.author, status='published')
+
+        self.assertRevalidates('/feed/rss/', publish)
+
+
+@test_settings
+class ResponsiveImageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        cache.clear()
+        author = User.objects.create_user('author', 'author@example.com', 'password', role='author')
+        self.blog = Blog(title='Pictured', body='x', author=author, status='published')
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 500)).save(buffer, 'PNG')
+        self.blog.featured_image.save('photo.png', ContentFile(buffer.getvalue()))
+
+    def test_srcset_of_derivatives(self):
+        html = responsive_image(self.blog.featured_image, 'card', alt='Pictured')
+        self.assertIn('photo_png_400.', html)
+        self.assertIn('800w', html)
+        self.assertIn('width="400" height="200"', html)
+
+    def test_decompression_bomb_falls_back_to_the_original(self):
+        # Over twice MAX_IMAGE_PIXELS, Pillow refuses to open the image
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000), self.assertLogs('blog.templatetags.blog_images'):
+            html = responsive_image(self.blog.featured_image, 'card', alt='Pictured')
+        self.assertEqual(html, f'<img src="{self.blog.featured_image.url}" alt="Pictured">')
+
+
+@override_settings(REQUEST_PROFILING=True, QUERY_BUDGET_STRICT=True, BLOG_VIEW_COUNT_FLUSH_INTERVAL=30)
+@test_settings
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.blogs = create_blogs(8)
+        cls.reader = User.objects.get(username='reader')
+
+    def setUp(self):
+        # Views are buffered as in production, in a buffer dropped with the test
+        self.enterContext(mock.patch('blog.views.view_counts', ViewCountBuffer()))
+
+    def test_pages_stay_within_their_budgets(self):
+        anonymous, member = Client(), Client()
+        member.force_login(self.reader)
+        urls = [
+            '/', '/?sort=rating', '/?sort=trending', '/?sort=views', '/?search=words', '/?page=2',
+            f'/?category={self.blogs[1].category_id}', f'/?author={self.author.pk}', '/?cursor=',
+            self.blogs[0].get_absolute_url(), '/authors/', f'/accounts/author/{self.author.username}/',
+        ]
+        for client, name in ((anonymous, 'anonymous'), (member, 'member')):
+            for url in urls + (['/accounts/favorites/'] if client is member else []):
+                with self.subTest(client=name, url=url):
+                    # QueryBudgetExceeded fails the test
+                    self.assertEqual(client.get(url).status_code, 200)
+
+
+@test_settings
+class SessionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.blogs = create_blogs(2)
+
+    def session_queries(self, client):
+        with CaptureQueriesContext(connection) as captured:
+            for url in ('/', self.blogs[0].get_absolute_url(), '/authors/'):
+                self.assertEqual(client.get(url).status_code, 200)
+        return [query['sql'] for query in captured if '"django_session"' in query['sql']]
+
+    def test_anonymous_readers_load_no_session(self):
+        self.assertEqual(self.session_queries(self.client), [])
+
+    def test_member_sessions_per_engine(self):
+        for engine, queries in (
+            ('django.contrib.sessions.backends.db', 3),
+            ('django.contrib.sessions.backends.signed_cookies', 0),
+        ):
+            # SessionMiddleware picks its engine up when the client's handler is built
+            with self.subTest(engine=engine), override_settings(SESSION_ENGINE=engine):
+                client = Client()
+                client.force_login(self.author)
+                self.assertEqual(len(self.session_queries(client)), queries)
+
+
+@test_settings
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.blogs = create_blogs(2)
+        cls.reader = User.objects.get(username='reader')
+
+    async def test_detail(self):
+        response = await self.async_client.get(self.blogs[0].get_absolute_url())
+        self.assertContains(response, self.blogs[0].title)
+        response = await self.async_client.get('/blog/missing/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_toggle_favorite(self):
+        await self.async_client.aforce_login(self.reader)
+        url = f'/blog/{self.blogs[1].slug}/favorite/'
+        response = await self.async_client.post(url)
+        self.assertEqual(response.json()['is_favorited'], True)
+        self.assertEqual(await OutgoingEmail.objects.acount(), 1)
+        response = await self.async_client.post(url)
+        self.assertEqual(response.json()['is_favorited'], False)
+        blog = await Blog.objects.aget(pk=self.blogs[1].pk)
+        self.assertEqual(blog.favorite_count, 0)
+
+    async def test_rate_blog(self):
+        await self.async_client.aforce_login(self.reader)
+        url = f'/blog/{self.blogs[0].slug}/rate/'
+        response = await self.async_client.post(url, {'score': 5})
+        self.assertEqual((response.json()['average_rating'], response.json()['rating_count']), (5, 1))
+        response = await self.async_client.post(url, {'score': 9})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_anonymous_writes_redirect_to_login(self):
+        response = await self.async_client.post(f'/blog/{self.blogs[0].slug}/favorite/')
+        self.assertEqual(response.status_code, 302)
+
+
+class StaticFileHeaderTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.static_root)
+        # WhiteNoise indexes STATIC_ROOT when its middleware is built, and
+        # only serves it itself without DEBUG
+        cls.enterClassContext(override_settings(
+            DEBUG=False,
+            STATIC_ROOT=cls.static_root,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+            },
+        ))
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_stylesheet_is_precompressed(self):
+        path = staticfiles_storage.path(staticfiles_storage.hashed_files['css/style.css'])
+        original = os.path.getsize(path)
+        self.assertLess(os.path.getsize(path + '.gz'), original)
+        self.assertLess(os.path.getsize(path + '.br'), os.path.getsize(path + '.gz'))
+
+    def test_encoding_is_negotiated(self):
+        url = staticfiles_storage.url('css/style.css')
+        for accept, encoding in (('br, gzip', 'br'), ('gzip', 'gzip'), ('', None)):
+            with self.subTest(accept=accept):
+                response = self.client.get(url, headers={'Accept-Encoding': accept})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.headers.get('Content-Encoding'), encoding)
+                self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_hashed_files_are_cached_immutable(self):
+        response = self.client.get(staticfiles_storage.url('css/style.css'))
+        cache_control = response['Cache-Control']
+        self.assertIn('public', cache_control)
+        self.assertIn('immutable', cache_control)
+        self.assertGreaterEqual(int(cache_control.split('max-age=')[1].split(',')[0]), 365 * 24 * 3600)
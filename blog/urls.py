@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 app_name = 'blog'
@@ -6,6 +6,8 @@ app_name = 'blog'
 urlpatterns = [
     path('', views.home_view, name='home'),
     path('authors/', views.authors_view, name='authors'),
+    path('feed/<str:format>/', views.site_feed, name='feed'),
+    path('category/<int:pk>/feed/<str:format>/', views.category_feed, name='category_feed'),
     path('create/', views.blog_create_view, name='create'),
     path('my-blogs/', views.my_blogs_view, name='my_blogs'),
     path('blog/<slug:slug>/', views.blog_detail_view, name='detail'),
@@ -13,4 +15,9 @@ urlpatterns = [
     path('blog/<slug:slug>/delete/', views.blog_delete_view, name='delete'),
     path('blog/<slug:slug>/favorite/', views.toggle_favorite, name='toggle_favorite'),
     path('blog/<slug:slug>/rate/', views.rate_blog, name='rate_blog'),
+    path('api/ratings/', views.bulk_rate, name='bulk_rate'),
+    path('api/favorites/', views.bulk_favorites, name='bulk_favorites'),
+    path('metrics/cache/', views.cache_metrics, name='cache_metrics'),
+    path('sitemap.xml', views.sitemap, name='sitemap'),
+    re_path(r'^(?P<name>sitemap-[a-z]+-\d+\.xml)$', views.sitemap, name='sitemap_page'),
 ]
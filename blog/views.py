@@ -1,27 +1,54 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.auth.decorators import login_required
+import json
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, get_object_or_404, redirect
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q, Avg
 from django.contrib.auth import get_user_model
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Prefetch, Subquery, aprefetch_related_objects
+from django.http import Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
 from django.views.decorators.http import require_POST
-from .models import Blog, Category, Rating, Favorite
+from django.views.static import serve
+from blog_site.db_router import replica_reads
+from notifications.models import aqueue_email, queue_email
+from .models import Blog, Category, Rating, Favorite, lock_user, with_author_stats
+from .caching import (
+    cached_queryset, conditional_page, get_stats, get_version, is_shared_page, record,
+    shared_cache, versions_state,
+)
 from .forms import BlogForm, CategoryForm
+from .home_feed import home_feeds
+from .pagination import cursor_pagination_enabled, paginate
+from .search import get_search_backend
+from .syndication import feed_page_state, feed_response
+from .signals import deferred_counters
+from .sitemaps import INDEX_NAME, sitemap_root
+from .view_counts import view_counts
 
 User = get_user_model()
 
+def home_state(request):
+    # Publishing, editing or deleting a blog, new scores and category or
+    # author changes each bump one of these, so the table needn't be scanned
+    state = versions_state('blog_card', 'blog_detail', 'blog_scores', 'filter_categories', 'filter_authors')
+    if state is None:
+        return None
+    last_modified, versions = state
+    return last_modified, (request.get_full_path(), versions)
+
+@replica_reads
+@conditional_page(home_state)
 def home_view(request):
-    blogs = Blog.objects.filter(status='published').select_related('author', 'category').order_by('-created_at')
+    blogs = Blog.objects.filter(status='published').select_related('author', 'category').defer('body')
     
     # Search functionality
     search_query = request.GET.get('search')
     if search_query:
-        blogs = blogs.filter(
-            Q(title__icontains=search_query) | 
-            Q(body__icontains=search_query) |
-            Q(author__username__icontains=search_query)
-        )
+        blogs = get_search_backend().search(blogs, search_query)
     
     # Category filter
     category_id = request.GET.get('category')
@@ -36,18 +63,30 @@ def home_view(request):
     # Sort by rating
     sort_by = request.GET.get('sort')
     if sort_by == 'rating':
-        blogs = blogs.annotate(avg_rating=Avg('ratings__score')).order_by('-avg_rating', '-created_at')
+        ordering = ['-rating_score', '-created_at', '-id']
+    elif sort_by == 'trending':
+        ordering = ['-trending_score', '-id']
     elif sort_by == 'views':
-        blogs = blogs.order_by('-views', '-created_at')
+        ordering = ['-views', '-created_at', '-id']
+    else:
+        ordering = ['-created_at', '-id']
+    # Relevance ranks can't be used as a keyset, so cursor pages stay chronological
+    if search_query and not sort_by and not cursor_pagination_enabled(request):
+        ordering.insert(0, '-search_rank')
     
-    # Pagination
-    paginator = Paginator(blogs, 6)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination; unsearched numbered pages come from the materialized feed
+    page_obj = None
+    if not search_query and not cursor_pagination_enabled(request):
+        page_obj = home_feeds.get_page(blogs, ordering, category_id, author_id, request.GET.get('page'), 6)
+    if page_obj is None:
+        page_obj = paginate(request, blogs, 6, ordering)
     
     # Get categories and authors for filters
-    categories = Category.objects.all()
-    authors = User.objects.filter(role__in=['author', 'admin'], blogs__status='published').distinct()
+    categories = cached_queryset('filter_categories', Category.objects.all())
+    authors = cached_queryset(
+        'filter_authors',
+        User.objects.filter(role__in=['author', 'admin'], blogs__status='published').distinct()
+    )
     
     context = {
         'page_obj': page_obj,
@@ -57,39 +96,133 @@ def home_view(request):
         'selected_category': category_id,
         'selected_author': author_id,
         'sort_by': sort_by,
+        'card_version': get_version('blog_card'),
     }
     return render(request, 'blog/home.html', context)
 
-def blog_detail_view(request, slug):
-    blog = get_object_or_404(Blog, slug=slug, status='published')
-    
-    # Increment views
-    blog.views += 1
-    blog.save(update_fields=['views'])
-    
-    # Get user's rating if authenticated
-    user_rating = None
-    is_favorited = False
-    if request.user.is_authenticated:
-        try:
-            user_rating = Rating.objects.get(blog=blog, user=request.user)
-        except Rating.DoesNotExist:
-            pass
-        is_favorited = Favorite.objects.filter(blog=blog, user=request.user).exists()
-    
-    # Get recent blogs by same author
-    related_blogs = Blog.objects.filter(
-        author=blog.author, 
-        status='published'
-    ).exclude(id=blog.id)[:3]
+def detail_state(request, slug):
+    """Id, updated_at and rating aggregates of the published blog ``slug``, or None.
+
+    The blog is kept on the request, so rendering the page on a cache miss
+    doesn't fetch it again.
+    """
+    if not hasattr(request, '_blog'):
+        blogs = Blog.objects.select_related('author', 'category')
+        if not shared_cache():
+            # Without a blog_detail version, the author's other posts listed
+            # on the page are validated on their newest edit and their count
+            posts = Blog.objects.filter(author=OuterRef('author'), status='published').order_by().values('author')
+            blogs = blogs.annotate(
+                author_posts_updated=Subquery(posts.annotate(newest=Max('updated_at')).values('newest')),
+                author_posts=Subquery(posts.annotate(count=Count('id')).values('count')),
+            )
+        request._blog = blogs.filter(slug=slug, status='published').first()
+    blog = request._blog
+    if blog is None:
+        return None
+    return blog.id, blog.updated_at, blog.rating_sum, blog.rating_count
+
+# What the detail page shows of its author
+DETAIL_AUTHOR_FIELDS = ('username', 'first_name', 'last_name', 'role', 'bio', 'profile_picture')
+
+def detail_page_state(request, slug):
+    state = detail_state(request, slug)
+    if state is None:
+        return None
+    if shared_cache():
+        # Category and author renames only show in the blog_detail version
+        return state[1], (state, get_version('blog_detail'))
+    blog = request._blog
+    return max(blog.updated_at, blog.author_posts_updated), (
+        state,
+        [str(getattr(blog.author, field)) for field in DETAIL_AUTHOR_FIELDS],
+        blog.category.name if blog.category else None,
+        blog.author_posts_updated,
+        blog.author_posts,
+    )
+
+def record_detail_view(request, slug):
+    # A reader revalidating the page still read it
+    view_counts.record(detail_state(request, slug)[0])
+
+def detail_cache_key(slug, state):
+    blog_id, updated_at, rating_sum, rating_count = state
+    return 'blog:page:%s:%s:%s:%s:%s' % (
+        slug, updated_at.timestamp(), rating_sum, rating_count, get_version('blog_detail'),
+    )
+
+def cached_detail_page(request, slug):
+    """Return ``(cache_key, response)`` for the shared anonymous detail page.
+
+    Anonymous readers without pending messages all see the same page, so it
+    is served from the cache after a single lookup of what it depends on.
+    Both are None for pages rendered per user; the response is None on a miss.
+    """
+    if not shared_cache() or not is_shared_page(request):
+        return None, None
+    state = detail_state(request, slug)
+    if state is None:
+        raise Http404('No Blog matches the given query.')
+    cache_key = detail_cache_key(slug, state)
+    content = cache.get(cache_key)
+    record('blog_detail', content is not None)
+    if content is None:
+        return cache_key, None
+    view_counts.record(state[0])
+    return cache_key, HttpResponse(content)
+
+@replica_reads
+@conditional_page(detail_page_state, not_modified=record_detail_view)
+async def blog_detail_view(request, slug):
+    cache_key, response = await sync_to_async(cached_detail_page)(request, slug)
+    if response is not None:
+        return response
+    
+    # Author's other recent posts come from one prefetch query
+    recent_blogs = Prefetch(
+        'author__blogs',
+        queryset=Blog.objects.filter(status='published').defer('body').order_by('-created_at', '-id')[:4],
+        to_attr='recent_blogs',
+    )
+    # Shared pages already fetched the blog for their cache key
+    blog = getattr(request, '_blog', None)
+    if blog is not None:
+        await aprefetch_related_objects([blog], recent_blogs)
+    else:
+        blogs = Blog.objects.select_related('author', 'category').prefetch_related(recent_blogs)
+        
+        # The reader's own rating and favorite are fetched along with the blog
+        user = await request.auser()
+        if user.is_authenticated:
+            blogs = blogs.annotate(
+                user_rating=Subquery(
+                    Rating.objects.filter(blog=OuterRef('pk'), user=user).values('score')[:1]
+                ),
+                is_favorited=Exists(Favorite.objects.filter(blog=OuterRef('pk'), user=user)),
+            )
+        blog = await aget_object_or_404(blogs, slug=slug, status='published')
+    
+    # Buffer the hit; show the count including views not yet flushed
+    blog.views += await view_counts.arecord(blog.id)
     
     context = {
         'blog': blog,
-        'user_rating': user_rating,
-        'is_favorited': is_favorited,
-        'related_blogs': related_blogs,
+        'user_rating': getattr(blog, 'user_rating', None),
+        'is_favorited': getattr(blog, 'is_favorited', False),
+        'related_blogs': [b for b in blog.author.recent_blogs if b.pk != blog.pk][:3],
     }
-    return render(request, 'blog/detail.html', context)
+    # Context processors and the messages framework still use the sync ORM
+    response = await sync_to_async(render)(request, 'blog/detail.html', context)
+    if cache_key is not None:
+        await cache.aset(cache_key, response.content, getattr(settings, 'BLOG_DETAIL_CACHE_TIMEOUT', 300))
+    return response
+
+def sitemap(request, name=INDEX_NAME):
+    # Written by generate_sitemaps; the front-end server should serve these
+    # files itself, this only covers deployments where it doesn't.
+    response = serve(request, name, document_root=sitemap_root())
+    patch_cache_control(response, public=True, max_age=0, s_maxage=getattr(settings, 'BLOG_PAGE_S_MAXAGE', 60))
+    return response
 
 @login_required
 def blog_create_view(request):
@@ -142,49 +275,78 @@ def my_blogs_view(request):
         messages.error(request, 'You need to be an author to access this page.')
         return redirect('blog:home')
     
-    blogs = Blog.objects.filter(author=request.user).order_by('-created_at')
+    blogs = Blog.objects.filter(author=request.user).select_related('category').defer('body')
     
     # Pagination
-    paginator = Paginator(blogs, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, blogs, 10, ['-created_at', '-id'])
     
     return render(request, 'blog/my_blogs.html', {'page_obj': page_obj})
 
+AUTHOR_ORDERINGS = {
+    'posts': ['-published_count', 'id'],
+    'views': ['-total_views', 'id'],
+    'rating': ['-avg_rating', 'id'],
+    'recent': ['-last_published', 'id'],
+}
+
+@replica_reads
 def authors_view(request):
-    authors = User.objects.filter(
-        role__in=['author', 'admin'],
-        blogs__status='published'
-    ).distinct().order_by('first_name', 'last_name')
+    authors = with_author_stats(
+        User.objects.filter(role__in=['author', 'admin'])
+    ).filter(published_count__gt=0)
+    
+    # Sort by stats, alphabetically by default
+    sort_by = request.GET.get('sort')
+    ordering = AUTHOR_ORDERINGS.get(sort_by, ['first_name', 'last_name', 'id'])
     
     # Pagination
-    paginator = Paginator(authors, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, authors, 12, ordering)
     
-    return render(request, 'blog/authors.html', {'page_obj': page_obj})
+    return render(request, 'blog/authors.html', {'page_obj': page_obj, 'sort_by': sort_by})
+
+def site_feed_state(request, format):
+    return feed_page_state(request, 'site', format, Blog.objects.filter(status='published'))
+
+@conditional_page(site_feed_state, public=True)
+def site_feed(request, format):
+    return feed_response(
+        request, 'site', Blog.objects.filter(status='published'), format,
+        'Blog Site', reverse('blog:home'), 'Latest posts on Blog Site',
+    )
+
+def category_feed_state(request, pk, format):
+    return feed_page_state(
+        request, f'category:{pk}', format, Blog.objects.filter(status='published', category_id=pk),
+    )
+
+@conditional_page(category_feed_state, public=True)
+def category_feed(request, pk, format):
+    category = get_object_or_404(Category, pk=pk)
+    return feed_response(
+        request, f'category:{pk}', Blog.objects.filter(status='published', category=category), format,
+        f'Blog Site: {category.name}', f"{reverse('blog:home')}?category={pk}",
+        category.description or f'Latest posts in {category.name}',
+    )
 
 @login_required
 @require_POST
-def toggle_favorite(request, slug):
-    blog = get_object_or_404(Blog, slug=slug, status='published')
-    favorite, created = Favorite.objects.get_or_create(user=request.user, blog=blog)
+async def toggle_favorite(request, slug):
+    user = await request.auser()
+    blog = await aget_object_or_404(Blog.objects.select_related('author'), slug=slug, status='published')
+    # toggle_favorite() locks the user inside a transaction, which needs one thread
+    created = await sync_to_async(blog.toggle_favorite)(user)
     
     if not created:
-        favorite.delete()
         is_favorited = False
         message = 'Removed from favorites'
     else:
         is_favorited = True
         message = 'Added to favorites'
         
-        # Send email notification (simplified for console backend)
-        from django.core.mail import send_mail
-        from django.conf import settings
-        
+        # Queue email notification for the send_queued_email worker
         subject = f'You favorited: {blog.title}'
         message_body = f'''
-        Hi {request.user.get_full_name()},
+        Hi {user.get_full_name()},
         
         You have added "{blog.title}" by {blog.author.get_full_name()} to your favorites.
         
@@ -194,13 +356,7 @@ def toggle_favorite(request, slug):
         Blog Site Team
         '''
         
-        send_mail(
-            subject,
-            message_body,
-            settings.DEFAULT_FROM_EMAIL,
-            [request.user.email],
-            fail_silently=True,
-        )
+        await aqueue_email(subject, message_body, [user.email])
     
     return JsonResponse({
         'is_favorited': is_favorited,
@@ -209,22 +365,16 @@ def toggle_favorite(request, slug):
 
 @login_required
 @require_POST
-def rate_blog(request, slug):
-    blog = get_object_or_404(Blog, slug=slug, status='published')
+async def rate_blog(request, slug):
+    user = await request.auser()
+    blog = await aget_object_or_404(Blog, slug=slug, status='published')
     score = int(request.POST.get('score', 0))
 
     if not (0 <= score <= 6):
         return JsonResponse({'error': 'Invalid rating score'}, status=400)
 
-    rating, created = Rating.objects.get_or_create(
-        blog=blog,
-        user=request.user,
-        defaults={'score': score}
-    )
-
-    if not created:
-        rating.score = score
-        rating.save()
+    # rate() locks the rating row inside a transaction, which needs one thread
+    await sync_to_async(blog.rate)(user, score)
 
     return JsonResponse({
         'success': True,
@@ -233,5 +383,151 @@ def rate_blog(request, slug):
         'user_rating': score
     })
 
+def load_batch(request, *keys):
+    """Parse the JSON object body of a batch request into the lists under ``keys``.
+
+    Raises ValueError with a message for the client when it is malformed.
+    """
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        raise ValueError('Request body must be JSON.')
+    if not isinstance(payload, dict):
+        raise ValueError('Request body must be a JSON object.')
+    batches = [payload.get(key, []) for key in keys]
+    if not all(isinstance(batch, list) for batch in batches):
+        raise ValueError(f'{", ".join(keys)} must be lists.')
+    max_items = getattr(settings, 'BLOG_BULK_API_MAX_ITEMS', 500)
+    if sum(len(batch) for batch in batches) > max_items:
+        raise ValueError(f'At most {max_items} items per request.')
+    return batches
+
+def blog_summaries(blog_ids, user):
+    """Stored aggregates and the user's own rating and favorite, by slug."""
+    blogs = Blog.objects.filter(pk__in=blog_ids).annotate(
+        user_rating=Subquery(Rating.objects.filter(blog=OuterRef('pk'), user=user).values('score')[:1]),
+        is_favorited=Exists(Favorite.objects.filter(blog=OuterRef('pk'), user=user)),
+    ).only('slug', 'rating_sum', 'rating_count', 'favorite_count')
+    return {
+        blog.slug: {
+            'average_rating': blog.get_average_rating(),
+            'rating_count': blog.get_rating_count(),
+            'favorite_count': blog.favorite_count,
+            'user_rating': blog.user_rating,
+            'is_favorited': blog.is_favorited,
+        }
+        for blog in blogs
+    }
+
+@login_required
+@require_POST
+def bulk_rate(request):
+    """Rate many blogs at once: ``{"ratings": [{"slug": ..., "score": 0-6}, ...]}``."""
+    try:
+        ratings, = load_batch(request, 'ratings')
+        scores = {}
+        for item in ratings:
+            if not isinstance(item, dict) or not isinstance(item.get('slug'), str):
+                raise ValueError('Each rating needs a slug and a score.')
+            score = item.get('score')
+            if not isinstance(score, int) or isinstance(score, bool) or not (0 <= score <= 6):
+                raise ValueError(f'Invalid rating score for {item["slug"]}.')
+            scores[item['slug']] = score
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    blog_ids = dict(Blog.objects.filter(status='published', slug__in=scores).values_list('slug', 'id'))
+    with transaction.atomic():
+        lock_user(request.user)
+        previous = dict(
+            Rating.objects.filter(user=request.user, blog_id__in=blog_ids.values()).values_list('blog_id', 'score')
+        )
+        Rating.objects.bulk_create(
+            [Rating(blog_id=blog_id, user=request.user, score=scores[slug]) for slug, blog_id in blog_ids.items()],
+            update_conflicts=True, unique_fields=['blog', 'user'], update_fields=['score'],
+        )
+        Blog.add_to_counters({
+            blog_id: (
+                {'rating_sum': scores[slug] - previous[blog_id]} if blog_id in previous
+                else {'rating_sum': scores[slug], 'rating_count': 1}
+            )
+            for slug, blog_id in blog_ids.items()
+        })
+
+    return JsonResponse({
+        'blogs': blog_summaries(blog_ids.values(), request.user),
+        'missing': sorted(set(scores) - set(blog_ids)),
+    })
+
+@login_required
+@require_POST
+def bulk_favorites(request):
+    """Add and remove many favorites at once: ``{"add": [slugs], "remove": [slugs]}``."""
+    try:
+        add, remove = load_batch(request, 'add', 'remove')
+        if not all(isinstance(slug, str) for slug in add + remove):
+            raise ValueError('Slugs must be strings.')
+        if set(add) & set(remove):
+            raise ValueError('A blog cannot be both added and removed.')
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
 
+    blogs = {
+        slug: (blog_id, title)
+        for slug, blog_id, title in Blog.objects.filter(
+            status='published', slug__in=add + remove
+        ).values_list('slug', 'id', 'title')
+    }
+    add_ids = {blogs[slug][0] for slug in add if slug in blogs}
+    remove_ids = {blogs[slug][0] for slug in remove if slug in blogs}
+    with transaction.atomic():
+        lock_user(request.user)
+        existing = set(
+            Favorite.objects.filter(user=request.user, blog_id__in=add_ids | remove_ids).values_list('blog_id', flat=True)
+        )
+        added = add_ids - existing
+        removed = remove_ids & existing
+        Favorite.objects.bulk_create(
+            [Favorite(user=request.user, blog_id=blog_id) for blog_id in added], ignore_conflicts=True
+        )
+        with deferred_counters():
+            Favorite.objects.filter(user=request.user, blog_id__in=removed).delete()
+        Blog.add_to_counters({
+            **{blog_id: {'favorite_count': 1} for blog_id in added},
+            **{blog_id: {'favorite_count': -1} for blog_id in removed},
+        })
+
+        if added:
+            # One notification for the whole batch rather than one per blog
+            titles = '\n'.join(f'        - {title}' for blog_id, title in blogs.values() if blog_id in added)
+            subject = f'You added {len(added)} blogs to your favorites'
+            message_body = f'''
+        Hi {request.user.get_full_name()},
+        
+        You have added these blogs to your favorites:
+{titles}
+        
+        You can view all your favorites at: {request.build_absolute_uri('/accounts/favorites/')}
+        
+        Best regards,
+        Blog Site Team
+        '''
+            queue_email(subject, message_body, [request.user.email])
+
+    return JsonResponse({
+        'blogs': blog_summaries(add_ids | remove_ids, request.user),
+        'added': sorted(slug for slug, (blog_id, title) in blogs.items() if blog_id in added),
+        'removed': sorted(slug for slug, (blog_id, title) in blogs.items() if blog_id in removed),
+        'missing': sorted(set(add + remove) - set(blogs)),
+    })
 
+@user_passes_test(lambda user: user.is_staff)
+def cache_metrics(request):
+    lines = [
+        '# HELP blog_fragment_cache_requests_total Fragment cache lookups by result.',
+        '# TYPE blog_fragment_cache_requests_total counter',
+    ]
+    for name, counts in get_stats().items():
+        for result, value in counts.items():
+            lines.append(f'blog_fragment_cache_requests_total{{fragment="{name}",result="{result}"}} {value}')
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4')
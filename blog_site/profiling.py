@@ -0,0 +1,146 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('request_profile', default=None)
+_log_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def _profiled_render(render):
+    def wrapper(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return render(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.template_time += time.perf_counter() - start
+    wrapper.profiled = True
+    return wrapper
+
+
+class QueryProfilingMiddleware:
+    """Measure SQL queries, DB time, template time and latency per request.
+
+    Enabled by ``REQUEST_PROFILING``. Each request is tagged with its URL
+    name (``blog:home``...) and can be reported through a ``Server-Timing``
+    header, appended as a JSON line to ``REQUEST_PROFILING_LOG`` for the
+    ``profiling_report`` command, and checked against ``QUERY_BUDGETS``.
+    Budget overruns are logged, or raise ``QueryBudgetExceeded`` when
+    ``QUERY_BUDGET_STRICT`` is set (handy in tests).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        if not getattr(Template.render, 'profiled', False):
+            Template.render = _profiled_render(Template.render)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            with self.wrap_queries(profile):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        # Connections are per thread and the ORM runs on the request's sync
+        # thread, so the wrappers are installed and removed there.
+        stack = await sync_to_async(self.wrap_queries)(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current.reset(token)
+        return self.finish(request, response, profile, time.perf_counter() - start)
+
+    def wrap_queries(self, profile):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(profile))
+        return stack
+
+    def finish(self, request, response, profile, total):
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        if getattr(settings, 'REQUEST_PROFILING_SERVER_TIMING', True):
+            response['Server-Timing'] = (
+                f'db;dur={profile.db_time * 1000:.1f};desc="{profile.queries} queries", '
+                f'tpl;dur={profile.template_time * 1000:.1f}, '
+                f'total;dur={total * 1000:.1f}'
+            )
+        self.log(request, response, view_name, profile, total)
+        self.check_budget(view_name, profile)
+        return response
+
+    def log(self, request, response, view_name, profile, total):
+        path = getattr(settings, 'REQUEST_PROFILING_LOG', None)
+        if not path:
+            return
+        record = {
+            'view': view_name,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': profile.queries,
+            'db_ms': round(profile.db_time * 1000, 3),
+            'template_ms': round(profile.template_time * 1000, 3),
+            'total_ms': round(total * 1000, 3),
+            'time': time.time(),
+        }
+        with _log_lock, open(path, 'a') as log_file:
+            log_file.write(json.dumps(record) + '\n')
+
+    def check_budget(self, view_name, profile):
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+        if budget is None or profile.queries <= budget:
+            return
+        message = f'{view_name} ran {profile.queries} queries (budget {budget})'
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,8 @@
+#!/usr/bin/env bash
+# Build step for deploys (e.g. Render's build command): install, write the
+# hashed and precompressed static files the manifest storage serves, migrate.
+set -o errexit
+
+pip install -r requirements.txt
+python manage.py collectstatic --no-input
+python manage.py migrate --no-input
@@ -0,0 +1,85 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from notifications.models import OutgoingEmail
+
+class Command(BaseCommand):
+    help = 'Send due emails from the outbox in batches over a single mail connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = self.send_batch(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}')
+            if not options['loop']:
+                break
+            if sent + failed < options['batch_size']:
+                time.sleep(options['interval'])
+
+    def send_batch(self, batch_size):
+        emails = self.claim(batch_size)
+        if not emails:
+            return 0, 0
+
+        # No transaction is open while sending, so each result is stored as
+        # soon as it is known
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as exc:
+            for email in emails:
+                email.mark_failed(exc)
+                self.save(email)
+            return 0, len(emails)
+
+        sent = failed = 0
+        try:
+            for email in emails:
+                message = EmailMessage(
+                    email.subject, email.body, email.from_email, email.to, connection=connection
+                )
+                try:
+                    message.send()
+                except Exception as exc:
+                    email.mark_failed(exc)
+                    failed += 1
+                else:
+                    email.mark_sent()
+                    sent += 1
+                self.save(email)
+        finally:
+            connection.close()
+        return sent, failed
+
+    def claim(self, batch_size):
+        """Mark up to ``batch_size`` due emails as sending and return them.
+
+        The rows are only locked while they are claimed; skip_locked lets
+        several workers claim batches at once. Claims not settled within
+        EMAIL_OUTBOX_CLAIM_TIMEOUT seconds, e.g. because their worker died,
+        fall due again.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            emails = list(
+                OutgoingEmail.objects.select_for_update(skip_locked=True)
+                .filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+                .order_by('next_attempt_at', 'id')[:batch_size]
+            )
+            OutgoingEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                status='sending',
+                next_attempt_at=now + timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_CLAIM_TIMEOUT', 600)),
+            )
+        return emails
+
+    def save(self, email):
+        email.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at'])
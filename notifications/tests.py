@@ -0,0 +1,62 @@
+from datetime import timedelta
+from unittest import mock
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from .models import OutgoingEmail, queue_email
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class SendQueuedEmailTests(TestCase):
+    def send(self, **options):
+        call_command('send_queued_email', stdout=mock.Mock(), **options)
+
+    def test_sends_due_emails_outside_a_transaction(self):
+        emails = [queue_email(f'Subject {number}', 'Body', ['reader@example.com']) for number in range(3)]
+        later = queue_email('Later', 'Body', ['reader@example.com'])
+        OutgoingEmail.objects.filter(pk=later.pk).update(next_attempt_at=timezone.now() + timedelta(hours=1))
+        backend = type(mail.get_connection())
+        send_messages = backend.send_messages
+        # The atomic blocks TestCase wraps the test in
+        depth = len(connection.atomic_blocks)
+        in_transaction = []
+
+        def send_outside_transaction(self, messages):
+            in_transaction.append(len(connection.atomic_blocks) > depth)
+            return send_messages(self, messages)
+
+        with mock.patch.object(backend, 'send_messages', send_outside_transaction):
+            self.send()
+        self.assertEqual([message.subject for message in mail.outbox], [email.subject for email in emails])
+        self.assertEqual(in_transaction, [False] * 3)
+        self.assertEqual(OutgoingEmail.objects.filter(status='sent').count(), 3)
+        self.assertEqual(OutgoingEmail.objects.get(subject='Later').status, 'pending')
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_DELAY=60)
+    def test_failures_are_retried_with_backoff(self):
+        email = queue_email('Subject', 'Body', ['reader@example.com'])
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError('refused')):
+            self.send()
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts, email.last_error), ('pending', 1, 'refused'))
+            self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+            OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+            self.send()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+
+    def test_claimed_emails_wait_for_the_claim_to_expire(self):
+        email = queue_email('Subject', 'Body', ['reader@example.com'])
+        claimed = OutgoingEmail.objects.filter(pk=email.pk)
+        claimed.update(status='sending', next_attempt_at=timezone.now() + timedelta(minutes=5))
+        self.send()
+        self.assertEqual(mail.outbox, [])
+
+        # Its worker died; the email is sent once the claim runs out
+        claimed.update(next_attempt_at=timezone.now())
+        self.send()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(claimed.get().status, 'sent')